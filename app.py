@@ -1,9 +1,21 @@
-from flask import Flask, render_template, request
-from src.main import get_best_squad, get_best_possible_squad, get_gameweek
+import hashlib
+import threading
+from datetime import datetime, timezone
+from flask import Flask, jsonify, make_response, render_template, request, url_for
+from src.main import get_best_squad, get_best_possible_squad, get_gameweek, warm_up
+from src.load_data import get_bootstrap_snapshot
 from src.player_positioning import position_players
+from src.refresh import DataRefresher
+from src.jobs import submit_squad_job, get_job
+from src.picks_cache import log_picks_cache_stats
+from src.single_flight import single_flight
 
 app = Flask(__name__)
 
+_wildcard_page = None
+_wildcard_page_building = set()
+_wildcard_page_lock = threading.Lock()
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     result = None
@@ -14,20 +26,114 @@ def index():
         wildcard = request.form.get('wildcard') == 'on'
 
         try:
-            result = process_squad_data(team_id, free_transfers, wildcard)
+            if wildcard:
+                result = get_wildcard_page()[3]
+            else:
+                result = process_squad_data(team_id, free_transfers, wildcard)
         except Exception as e:
             error = str(e)
     else:
         try:
-            result = process_squad_data(None, 0, True)
+            _, etag, last_modified, result = get_wildcard_page()
         except Exception as e:
             error = str(e)
+        else:
+            # The page only changes with the data version, so browsers and proxies can revalidate cheaply
+            response = make_response()
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+            response.set_data(render_template('index.html', result=result, error=error))
+            return response
 
     return render_template('index.html', result=result, error=error)
 
-def process_squad_data(team_id, free_transfers, wildcard):
+def get_wildcard_page():
+    """
+    Returns the wildcard squad shown to every visitor, computed once per data version. After a new version is
+    published the previous page keeps being served while the new one is solved in a background thread; only the
+    very first page is solved in the request, shared by every request waiting for it.
+
+    :return: Tuple of (data version, ETag, Last-Modified, page data)
+    """
+    snapshot = get_bootstrap_snapshot()
+    with _wildcard_page_lock:
+        page = _wildcard_page
+        if page is not None and page[0] != snapshot.version and snapshot.version not in _wildcard_page_building:
+            _wildcard_page_building.add(snapshot.version)
+            threading.Thread(target=_build_wildcard_page_in_background, args=(snapshot,), daemon=True).start()
+
+    if page is not None:
+        return page
+    return single_flight(("wildcard_page", snapshot.version), _build_wildcard_page, snapshot)
+
+def _build_wildcard_page(snapshot):
+    """
+    Solves the wildcard squad from the eligible-player table of the snapshot's data version and publishes the page.
+    If a newer version was published while it was being solved the page is returned but not kept, since it may mix
+    both versions, and the next request starts a rebuild for the newer one.
+    """
+    global _wildcard_page
+    result = process_squad_data(None, 0, True, fresh=True)
+    etag = hashlib.sha1(repr(snapshot.version).encode()).hexdigest()[:20]
+    last_modified = datetime.fromtimestamp(snapshot.version[1] / 1e9, tz=timezone.utc)
+    page = (snapshot.version, etag, last_modified, result)
+
+    # The solve read whatever version was current, which is only the snapshot's if nothing was published meanwhile
+    if get_bootstrap_snapshot().version != snapshot.version:
+        return page
+    with _wildcard_page_lock:
+        if _wildcard_page is None or _wildcard_page[0][1] <= snapshot.version[1]:
+            _wildcard_page = page
+    return page
+
+def _build_wildcard_page_in_background(snapshot):
+    try:
+        single_flight(("wildcard_page", snapshot.version), _build_wildcard_page, snapshot)
+    except Exception as e:
+        print(f"Background rebuild of the wildcard page failed: {str(e)}")
+    finally:
+        with _wildcard_page_lock:
+            _wildcard_page_building.discard(snapshot.version)
+
+def warm_up_pages():
+    warm_up()
+    snapshot = get_bootstrap_snapshot()
+    single_flight(("wildcard_page", snapshot.version), _build_wildcard_page, snapshot)
+    # Runs after every scheduled refresh, so the log shows how well the picks cache holds up between refreshes
+    log_picks_cache_stats()
+
+@app.route('/api/squad', methods=['POST'])
+def submit_squad():
+    params = request.get_json(silent=True) or request.form
+    wildcard = str(params.get('wildcard', False)).lower() in ('true', 'on', '1')
+
+    try:
+        team_id = None if wildcard else int(params['team_id'])
+        free_transfers = int(params.get('free_transfers', 0))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'team_id and free_transfers must be integers'}), 400
+
+    job = submit_squad_job(team_id, free_transfers, wildcard)
+    response = job.to_dict()
+    response['status_url'] = url_for('squad_status', job_id=job.job_id)
+    return jsonify(response), 202
+
+@app.route('/api/squad/<job_id>', methods=['GET'])
+def squad_status(job_id):
+    # Clients may long-poll for up to 30 seconds instead of polling repeatedly
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    job = get_job(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+def process_squad_data(team_id, free_transfers, wildcard, fresh=False):
     if wildcard:
-        squad, best_11_df, captain, predicted_points, transfers = get_best_possible_squad()
+        squad, best_11_df, captain, predicted_points, transfers = get_best_possible_squad(fresh=fresh)
     else:
         squad, best_11_df, captain, predicted_points, transfers = get_best_squad(int(team_id), int(free_transfers), wildcard)
     
@@ -35,9 +141,10 @@ def process_squad_data(team_id, free_transfers, wildcard):
     total_cost = squad['value'].sum()
 
     # Sort squad and best_11 DataFrames
+    # position may be categorical, which sorts by category code, so sort on the mapped order instead
     position_order = {'GK': 1, 'DEF': 2, 'MID': 3, 'FWD': 4}
-    squad = squad.sort_values(by='position', key=lambda x: x.map(position_order.get))
-    best_11_df = best_11_df.sort_values(by='position', key=lambda x: x.map(position_order.get))
+    squad = squad.sort_values(by='position', key=lambda x: x.astype(str).map(position_order), kind='stable')
+    best_11_df = best_11_df.sort_values(by='position', key=lambda x: x.astype(str).map(position_order), kind='stable')
 
     # Convert DataFrames to list of dictionaries
     squad = squad.to_dict('records')
@@ -58,4 +165,6 @@ def process_squad_data(team_id, free_transfers, wildcard):
     }
 
 if __name__ == '__main__':
+    # Refresh the data on a schedule instead of on the first request of the day, warming the caches after each refresh
+    DataRefresher(on_refresh=warm_up_pages).start()
     app.run(host='0.0.0.0', port=80, threaded=True)
@@ -0,0 +1,90 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from sklearn.linear_model import LinearRegression
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.correlation import POSITIONS, find_top_coefficients_by_position
+from src.load_data import load_and_filter_all_seasons_data
+
+
+def reference_fit(df, criteria, window=3):
+    """
+    The regression as calculate_expected_points fitted it before the closed-form rewrite: a pandas rolling average of
+    each player's previous game weeks and a scikit-learn LinearRegression, kept here as an independent reference.
+
+    :param df: Game week rows for one position, sorted by element and GW
+    :param criteria: The column averaged
+    :param window: Number of game weeks the rolling average covers
+    :return: (coef, intercept, R2), or None when no row has form
+    """
+    rolling_avg = df.groupby("element")[criteria].rolling(window=window, min_periods=1).mean()
+    rolling_avg = rolling_avg.reset_index(level=0, drop=True).groupby(df["element"]).shift(1)
+    fitted = df.assign(form=rolling_avg).dropna(subset=["form"])
+    fitted = fitted[fitted["form"] != 0]
+    if fitted.empty:
+        return None
+
+    X = fitted["form"].to_numpy().reshape(-1, 1)
+    y = fitted["total_points"].to_numpy()
+    model = LinearRegression().fit(X, y)
+    return model.coef_[0], model.intercept_, model.score(X, y)
+
+
+def per_column_scan(df):
+    """
+    The scan as it was before batching: one rolling average and one LinearRegression fit per position and column.
+    """
+    df = df.sort_values(by=["element", "GW"], kind="stable")
+    df = df[df["minutes"] > 0]
+    results = {}
+    for position_code in POSITIONS:
+        position_df = df[df["position"] == position_code].copy()
+        coefficients = {}
+        for column in position_df.select_dtypes(include="number").columns:
+            if column in ["element", "GW", "total_points"] or position_df[column].count() < 500:
+                continue
+            fitted = reference_fit(position_df, column)
+            if fitted is not None:
+                coefficients[column] = fitted
+        results[position_code] = coefficients
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the batched coefficient scan with a per-column "
+                                                 "LinearRegression reference.")
+    parser.add_argument("--min-gw", type=int, default=10)
+    parser.add_argument("--min-minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    df = load_and_filter_all_seasons_data(min_gw=args.min_gw, min_minutes=args.min_minutes)
+    print(f"{len(df)} rows")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = per_column_scan(df)
+        per_column_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = find_top_coefficients_by_position(df=df)
+        batched_seconds = time.perf_counter() - start
+
+    fits = 0
+    worst = 0.0
+    for position, coefficients in expected.items():
+        if set(coefficients) != set(batched.get(position, {})):
+            print(f"{position}: columns differ, {sorted(set(coefficients) ^ set(batched.get(position, {})))}")
+        for column, (coef, intercept, r2) in coefficients.items():
+            _, batched_coef, batched_intercept, _, batched_r2, _ = batched[position][column]
+            worst = max(worst, abs(coef - batched_coef), abs(intercept - batched_intercept), abs(r2 - batched_r2))
+            fits += 1
+
+    print(f"per-column LinearRegression: {per_column_seconds:.2f} s, batched: {batched_seconds:.2f} s "
+          f"({per_column_seconds / batched_seconds:.0f}x) for {fits} fits")
+    print(f"largest difference in coef, intercept or R2: {worst:.2e}")
@@ -0,0 +1,107 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Status codes served and paths answered with a full body, shared by every handler thread
+stats = Counter()
+full_responses = Counter()
+stats_lock = threading.Lock()
+
+
+def make_handler(source_dir, fail_rate, delay):
+    """
+    Returns a request handler that serves a data version folder the way the FPL API and GitHub raw URLs lay it out.
+    Last-Modified and If-Modified-Since come from SimpleHTTPRequestHandler, so unchanged files get a 304.
+    """
+
+    class StandInHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=source_dir, **kwargs)
+
+        def translate_path(self, path):
+            path = path.split("?", 1)[0]
+            if path.startswith("/api/bootstrap-static"):
+                path = "/bootstrap-static.json"
+            elif path.startswith("/raw/"):
+                path = path[len("/raw"):]
+            return super().translate_path(path)
+
+        def do_GET(self):
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_error(503)
+                return
+            super().do_GET()
+
+        def send_response(self, code, message=None):
+            with stats_lock:
+                stats[int(code)] += 1
+                if code == 200:
+                    full_responses[self.path] += 1
+            super().send_response(code, message)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def start_server(source_dir, fail_rate=0.0, delay=0.0):
+    """
+    Serves source_dir on a free local port in a background thread and points the downloaders and the fpl-data
+    folder at it and at a new temporary directory.
+
+    :return: The running server, to be shut down by the caller
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(source_dir, fail_rate, delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ["FPL_API_URL"] = f"{base_url}/api"
+    os.environ["FPL_GITHUB_RAW_URL"] = f"{base_url}/raw"
+    os.environ["FPL_DATA_DIR"] = tempfile.mkdtemp(prefix="fpl-data-")
+    return server
+
+
+def run(source_dir, rounds, fail_rate, delay):
+    """
+    Serves source_dir on a local port, points the downloaders at it and runs several refreshes into a temporary
+    fpl-data folder, printing the status codes served and the time each refresh took.
+    """
+    server = start_server(source_dir, fail_rate, delay)
+
+    import contextlib
+    import io
+    from src.refresh import refresh_data
+
+    try:
+        for round_number in range(1, rounds + 1):
+            stats.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                version = refresh_data(version=f"round-{round_number}")
+            elapsed = time.perf_counter() - start
+            print(f"round {round_number}: {'published' if version else 'failed'} in {elapsed:.2f} s, "
+                  f"responses {dict(sorted(stats.items()))}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise the data refresh against a local stand-in HTTP server.")
+    parser.add_argument("source_dir", help="Data version folder to serve, e.g. fpl-data/2024-08-01")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with a 503")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each request waits before answering")
+    args = parser.parse_args()
+
+    run(os.path.abspath(args.source_dir), args.rounds, args.fail_rate, args.delay)
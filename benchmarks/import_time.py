@@ -0,0 +1,35 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_cold_import(module="app", runs=5):
+    """
+    Measures the wall-clock time of importing a module in a fresh interpreter, which is what a container restart pays
+    before Flask can bind.
+
+    :param module: The module to import
+    :param runs: Number of fresh interpreters to start
+    :return: List of import times in seconds
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=PROJECT_ROOT, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time cold imports of the web app and the src package.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=["app", "src.build_squad", "src.main"])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        timings = time_cold_import(module, args.runs)
+        print(f"{module}: best {min(timings) * 1000:.0f} ms, median {sorted(timings)[len(timings) // 2] * 1000:.0f} ms")
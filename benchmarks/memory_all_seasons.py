@@ -0,0 +1,53 @@
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each mode runs in a fresh interpreter so peak RSS reflects that loader alone
+MODES = {
+    "csv": """
+import pandas as pd
+from src.load_data import get_data_file_path
+df = pd.read_csv(get_data_file_path("data/cleaned_merged_seasons.csv"), low_memory=False)
+df["position"] = df["position"].replace("GKP", "GK")
+df["element"] = df["element"].astype(str) + "-" + df["season_x"]
+counts = df[df["minutes"] >= 60].groupby("element")["GW"].count()
+df = df[df["element"].isin(counts[counts >= 10].index)]
+""",
+    "schema": """
+from src.load_data import load_and_filter_all_seasons_data
+df = load_and_filter_all_seasons_data()
+"""
+}
+
+MEASURE = """
+import resource
+def rss_kib():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmRSS"))
+import numpy, pandas
+baseline = rss_kib()
+{body}
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"{{len(df)}} rows, frame {{df.memory_usage(deep=True).sum() / 2**20:.1f}} MiB, peak RSS above imports {{(peak - baseline) / 1024:.1f}} MiB")
+"""
+
+
+def measure(mode):
+    """
+    Loads and filters every season with the given loader in a subprocess and returns its report line.
+    """
+    code = MEASURE.format(body=MODES[mode])
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, check=True, capture_output=True, text=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare peak memory of loading cleaned_merged_seasons.csv.")
+    parser.add_argument("modes", nargs="*", default=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        print(f"{mode}: {measure(mode)}")
@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+
+def git_revision():
+    """
+    Returns the current commit and whether the working tree has uncommitted changes, or (None, None) outside git.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def measure(function, runs):
+    """
+    Calls a function runs times with its output silenced. The first call is reported on its own because it pays for
+    cold caches, such as building column stores or fitting stored models.
+
+    :return: Dictionary with the first, best and median time in seconds and the number of runs
+    """
+    timings = []
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return {
+        "first": round(timings[0], 6),
+        "min": round(min(timings), 6),
+        "median": round(statistics.median(timings), 6),
+        "runs": runs
+    }
+
+
+def pipeline_cases(season):
+    """
+    Yields (name, function, runs override) for every timed stage, each function prepared with the inputs the stage
+    gets in the app. Inputs are built just before the stage that needs them, so each stage's first call still finds
+    its own caches cold.
+    """
+    from src.build_squad import get_eligible_players_for_gw, select_best_squad_ilp, optimize_transfers, select_best_11
+    from src.fixture_difficulty import scale_pts_by_difficulty, compute_scale_factors
+    from src.load_data import load_and_filter_data, get_bootstrap_snapshot
+    from src.season_simulation import simulate_season_2023_24
+    from src.x_pts import calculate_expected_points
+
+    yield "load_and_filter_data", lambda: load_and_filter_data(year=season, min_gw=5, min_minutes=60), None
+    with contextlib.redirect_stdout(io.StringIO()):
+        history = load_and_filter_data(year=season, min_gw=5, min_minutes=60)
+
+    yield "calculate_expected_points (fit)", lambda: calculate_expected_points(history), None
+    yield "calculate_expected_points (stored)", lambda: calculate_expected_points(), None
+    yield "scale_pts_by_difficulty (compute)", lambda: compute_scale_factors(), None
+    yield "scale_pts_by_difficulty (stored)", lambda: scale_pts_by_difficulty(), None
+
+    snapshot = get_bootstrap_snapshot()
+    yield "get_eligible_players_for_gw", lambda: get_eligible_players_for_gw(
+        gw=snapshot.gameweek, merged_gw_df=history, latest_data=snapshot.elements), None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        eligible = get_eligible_players_for_gw(gw=snapshot.gameweek, merged_gw_df=history, latest_data=snapshot.elements)
+        squad = select_best_squad_ilp(eligible, 1000, "now_cost", "xPts")
+        # A squad picked on form alone gives the transfer solver something to improve
+        current_team = select_best_squad_ilp(eligible, 1000, "now_cost", "avg_3w_ict")
+
+    yield "select_best_squad_ilp", lambda: select_best_squad_ilp(eligible, 1000, "now_cost", "xPts"), None
+    yield "optimize_transfers", lambda: optimize_transfers(current_team.copy(), eligible, 1, 1000), None
+    yield "select_best_11", lambda: select_best_11(squad), None
+    yield "simulate_season_2023_24", lambda: simulate_season_2023_24(), 1
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Prints each stage's best time against a previous results file and returns the stages that got slower by more
+    than the threshold, e.g. 0.2 for 20%.
+    """
+    with open(baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"\nAgainst {os.path.basename(baseline_path)} ({baseline.get('commit')}):")
+
+    slower = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"  {name:<36} new")
+            continue
+        ratio = result["min"] / previous["min"] if previous["min"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(f"  {name:<36} {previous['min'] * 1000:10.1f} ms -> {result['min'] * 1000:10.1f} ms ({ratio:.2f}x){flag}")
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the squad pipeline end to end on a synthetic data version.")
+    parser.add_argument("--data-dir", help="fpl-data folder for the synthetic data, a temporary folder by default")
+    parser.add_argument("--players", type=int, default=600)
+    parser.add_argument("--gameweeks", type=int, default=38)
+    parser.add_argument("--seasons", type=int, default=3, help="3 gives the 2023-24 replay a previous season to start from")
+    parser.add_argument("--next-gw", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=5, help="Calls per stage; the season simulation runs once")
+    parser.add_argument("--only", nargs="*", help="Stages to run, all by default")
+    parser.add_argument("--output", help=f"Results file, a new timestamped file in {RESULTS_DIR} by default")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown that fails --compare, 0.2 for 20%%")
+    args = parser.parse_args()
+
+    if args.seasons < 2:
+        parser.error("--seasons must be at least 2, the 2023-24 models and simulation need it")
+
+    # Everything reads and writes inside the synthetic folder, and nothing may reach the real APIs
+    os.environ["FPL_DATA_DIR"] = os.path.abspath(args.data_dir or tempfile.mkdtemp(prefix="fpl-bench-"))
+    os.environ["FPL_API_URL"] = "http://127.0.0.1:9/api/"
+    os.environ["FPL_GITHUB_RAW_URL"] = "http://127.0.0.1:9/"
+
+    from benchmarks.synthetic_data import generate_dataset
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_dataset(players=args.players, gameweeks=args.gameweeks, seasons=args.seasons,
+                         next_gw=args.next_gw, seed=args.seed)
+    print(f"Synthetic data in {os.environ['FPL_DATA_DIR']} written in {time.perf_counter() - start:.1f} s")
+
+    results = {}
+    for name, function, runs in pipeline_cases(season="2024-25"):
+        if args.only and name.split(" ")[0] not in args.only and name not in args.only:
+            continue
+        results[name] = measure(function, runs or args.runs)
+        result = results[name]
+        print(f"{name:<36} first {result['first'] * 1000:10.1f} ms  best {result['min'] * 1000:10.1f} ms  "
+              f"median {result['median'] * 1000:10.1f} ms")
+
+    commit, dirty = git_revision()
+    timestamp = datetime.now(timezone.utc)
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": timestamp.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": {"players": args.players, "gameweeks": args.gameweeks, "seasons": args.seasons,
+                  "next_gw": args.next_gw, "seed": args.seed},
+        "results": results
+    }
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"{timestamp.strftime('%Y%m%dT%H%M%S')}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare, args.threshold) else 0)
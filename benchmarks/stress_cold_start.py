@@ -0,0 +1,79 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.http_standin import start_server, full_responses, stats
+
+
+def cold_request(barrier, season):
+    """
+    Loads what a first request of the day needs, starting together with every other thread.
+    """
+    from src.load_data import load_latest_data, load_and_filter_data, load_fixture_data
+
+    barrier.wait()
+    bootstrap = load_latest_data()
+    history = load_and_filter_data(year=season, min_gw=5, min_minutes=60)
+    fixtures = load_fixture_data(year=season)
+    return len(bootstrap["elements"]), len(history), int(history["total_points"].sum()), len(fixtures)
+
+
+def run(source_dir, threads, delay, season):
+    """
+    Fires concurrent cold-start loads at an empty fpl-data folder backed by a stand-in server and checks that every
+    file was downloaded once, every thread saw the same data and no temporary files were left behind.
+
+    :return: True if all checks passed
+    """
+    server = start_server(source_dir, delay=delay)
+    barrier = threading.Barrier(threads)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [executor.submit(cold_request, barrier, season) for _ in range(threads)]
+            results, errors = [], []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(repr(e))
+    finally:
+        server.shutdown()
+    elapsed = time.perf_counter() - start
+
+    leftovers = [os.path.join(root, name) for root, dirs, files in os.walk(os.environ["FPL_DATA_DIR"])
+                 for name in dirs + files if name.endswith(".tmp")]
+    duplicated = {path: count for path, count in full_responses.items() if count > 1}
+
+    print(f"{threads} threads finished in {elapsed:.2f} s, responses {dict(sorted(stats.items()))}")
+    print(f"downloads per path: {dict(full_responses)}")
+    checks = {
+        "no errors": not errors,
+        "each file downloaded once": not duplicated,
+        "identical results": len(set(results)) == 1,
+        "no temporary files left": not leftovers
+    }
+    for name, passed in checks.items():
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+    for error in errors[:5]:
+        print(f"  {error}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress concurrent cold-start downloads against a local stand-in server.")
+    parser.add_argument("source_dir", help="Data version folder to serve, e.g. fpl-data/2024-08-01")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds each request waits before answering")
+    parser.add_argument("--season", default="2024-25")
+    args = parser.parse_args()
+
+    sys.exit(0 if run(os.path.abspath(args.source_dir), args.threads, args.delay, args.season) else 1)
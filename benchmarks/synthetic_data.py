@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.data_versions import get_fpl_data_dir, publish_version
+
+TEAMS = 20
+POSITIONS = np.array(["GK", "DEF", "MID", "FWD"])
+POSITION_SHARES = [0.1, 0.35, 0.4, 0.15]
+
+
+def season_names(seasons, last_season="2024-25"):
+    """
+    Returns consecutive season labels ending with last_season, e.g. 3 gives 2022-23, 2023-24 and 2024-25.
+    """
+    last_start = int(last_season[:4])
+    return [f"{year}-{(year + 1) % 100:02d}" for year in range(last_start - seasons + 1, last_start + 1)]
+
+
+def make_fixtures(rng, gameweeks):
+    """
+    Builds a fixtures.csv table where every team plays once per game week against a random opponent.
+    """
+    pairings = np.argsort(rng.random((gameweeks, TEAMS)), axis=1) + 1
+    matches = TEAMS // 2
+    return pd.DataFrame({
+        "id": np.arange(1, gameweeks * matches + 1),
+        "event": np.repeat(np.arange(1, gameweeks + 1), matches),
+        "team_h": pairings[:, 0::2].ravel(),
+        "team_a": pairings[:, 1::2].ravel(),
+        "team_h_difficulty": rng.integers(2, 6, gameweeks * matches),
+        "team_a_difficulty": rng.integers(2, 6, gameweeks * matches),
+        "kickoff_time": "2024-01-01T00:00:00Z",
+        "minutes": 90,
+        "team_a_score": rng.integers(0, 4, gameweeks * matches),
+        "team_h_score": rng.integers(0, 4, gameweeks * matches),
+        "finished": True
+    })
+
+
+def make_gameweeks(rng, fixtures, players, season):
+    """
+    Builds a merged_gw.csv table with one row per player and game week. Each player has a hidden skill that drives
+    their ICT index, and points follow the ICT index with noise, so the xPts regression has something to find.
+
+    :return: (rows, players) where players holds each player's team, position, skill and value
+    """
+    gameweeks = int(fixtures["event"].max())
+    squad = pd.DataFrame({
+        "team": rng.integers(1, TEAMS + 1, players),
+        "position": POSITIONS[rng.choice(len(POSITIONS), players, p=POSITION_SHARES)],
+        "skill": rng.gamma(2, 2, players)
+    })
+    squad["value"] = 40 + (squad["skill"] * 10).astype(int)
+
+    # Each team's fixture and venue per game week
+    home = fixtures[["event", "team_h", "id", "team_h_score", "team_a_score"]].set_axis(
+        ["GW", "team", "fixture", "team_h_score", "team_a_score"], axis=1).assign(was_home=True)
+    away = fixtures[["event", "team_a", "id", "team_h_score", "team_a_score"]].set_axis(
+        ["GW", "team", "fixture", "team_h_score", "team_a_score"], axis=1).assign(was_home=False)
+    schedule = pd.concat([home, away]).set_index(["GW", "team"])
+
+    element = np.tile(np.arange(1, players + 1), gameweeks)
+    gw = np.repeat(np.arange(1, gameweeks + 1), players)
+    team = squad["team"].to_numpy()[element - 1]
+    skill = squad["skill"].to_numpy()[element - 1]
+    played = schedule.reindex(pd.MultiIndex.from_arrays([gw, team]))
+
+    rows = len(element)
+    minutes = np.where(rng.random(rows) < 0.8, 90, rng.integers(0, 90, rows))
+    ict_index = np.round(np.maximum(0, skill + rng.normal(0, 2, rows)) * (minutes > 0), 1)
+    total_points = np.round(ict_index * 0.5 + rng.normal(1, 2, rows)).astype(int)
+
+    df = pd.DataFrame({
+        "name": [f"Player {e}" for e in element],
+        "position": squad["position"].to_numpy()[element - 1],
+        "team": [f"Team{t}" for t in team],
+        "element": element,
+        "GW": gw,
+        "fixture": played["fixture"].to_numpy(),
+        "was_home": played["was_home"].to_numpy(),
+        "minutes": minutes,
+        "total_points": total_points,
+        "ict_index": ict_index,
+        "value": squad["value"].to_numpy()[element - 1],
+        "bps": rng.integers(0, 30, rows),
+        "xP": np.round(rng.random(rows), 2),
+        "kickoff_time": "2024-01-01T00:00:00Z",
+        "team_a_score": played["team_a_score"].to_numpy(),
+        "team_h_score": played["team_h_score"].to_numpy(),
+        "season_x": season
+    })
+    return df, squad
+
+
+def make_bootstrap(squad, gameweeks, next_gw):
+    """
+    Builds a bootstrap-static-shaped document for the last season's players, with next_gw as the next game week.
+    """
+    elements = [{
+        "id": element,
+        "web_name": f"P{element}",
+        "first_name": "Player",
+        "second_name": str(element),
+        "element_type": int(np.flatnonzero(POSITIONS == player.position)[0]) + 1,
+        "team": int(player.team),
+        "now_cost": int(player.value),
+        "chance_of_playing_next_round": 75 if element % 7 == 0 else None,
+        "total_points": 0
+    } for element, player in enumerate(squad.itertuples(), start=1)]
+    events = [{"id": gw, "is_next": gw == next_gw, "is_current": gw == next_gw - 1, "finished": gw < next_gw}
+              for gw in range(1, gameweeks + 1)]
+    teams = [{"id": team, "name": f"Team{team}", "short_name": f"T{team:02d}"} for team in range(1, TEAMS + 1)]
+    return {"elements": elements, "events": events, "teams": teams}
+
+
+def generate_dataset(version="synthetic", players=600, gameweeks=38, seasons=2, next_gw=20, seed=0, publish=True):
+    """
+    Writes a synthetic data version laid out like a downloaded one: merged_gw.csv and fixtures.csv per season,
+    cleaned_merged_seasons.csv and bootstrap-static.json, inside the fpl-data folder (FPL_DATA_DIR when set).
+    The last season is 2024-25, so 2023-24 exists whenever seasons is at least 2.
+
+    :param version: Name of the version folder
+    :param players: Players per season
+    :param gameweeks: Game weeks per season
+    :param seasons: Number of seasons
+    :param next_gw: Game week bootstrap-static reports as next
+    :param seed: Random seed, the same arguments always give the same files
+    :param publish: Whether to point CURRENT at the new version
+    :return: Path of the version folder
+    """
+    rng = np.random.default_rng(seed)
+    version_dir = os.path.join(get_fpl_data_dir(), version)
+    data_dir = os.path.join(version_dir, "data")
+
+    all_seasons = []
+    for season in season_names(seasons):
+        fixtures = make_fixtures(rng, gameweeks)
+        df, squad = make_gameweeks(rng, fixtures, players, season)
+
+        os.makedirs(os.path.join(data_dir, season, "gws"), exist_ok=True)
+        fixtures.to_csv(os.path.join(data_dir, season, "fixtures.csv"), index=False)
+        df.drop(columns="season_x").to_csv(os.path.join(data_dir, season, "gws", "merged_gw.csv"), index=False)
+        all_seasons.append(df)
+
+    pd.concat(all_seasons).to_csv(os.path.join(data_dir, "cleaned_merged_seasons.csv"), index=False)
+    with open(os.path.join(version_dir, "bootstrap-static.json"), "w") as bootstrap_file:
+        json.dump(make_bootstrap(squad, gameweeks, next_gw), bootstrap_file)
+
+    if publish:
+        publish_version(version)
+    return version_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic FPL data version for benchmarks.")
+    parser.add_argument("--data-dir", help="fpl-data folder to write into, FPL_DATA_DIR or the project's by default")
+    parser.add_argument("--version", default="synthetic")
+    parser.add_argument("--players", type=int, default=600)
+    parser.add_argument("--gameweeks", type=int, default=38)
+    parser.add_argument("--seasons", type=int, default=2)
+    parser.add_argument("--next-gw", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.environ["FPL_DATA_DIR"] = os.path.abspath(args.data_dir)
+    print(generate_dataset(args.version, args.players, args.gameweeks, args.seasons, args.next_gw, args.seed))
@@ -0,0 +1,48 @@
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(file_path, mode="wb"):
+    """
+    Opens a temporary file next to file_path and moves it into place once the block completes, so readers see either
+    the previous file or the new one and never a partial write. If the block raises, the temporary file is removed
+    and file_path is left as it was.
+
+    The file is replaced rather than rewritten in place, which also keeps hard-linked copies in other data versions
+    unchanged.
+
+    :param file_path: File to write
+    :param mode: Mode the temporary file is opened with, "wb" or "w"
+    :return: Context manager yielding the open temporary file
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, mode) as file:
+            yield file
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_pickle(file_path):
+    """
+    Loads a pickled object, treating a missing or unreadable file (truncated, or written by an incompatible version
+    of the code) as absent so the caller rebuilds it.
+
+    :param file_path: Pickle file to load
+    :return: The unpickled object, or None
+    """
+    try:
+        with open(file_path, "rb") as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Failed to load {file_path}, rebuilding it: {str(e)}")
+        return None
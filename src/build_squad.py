@@ -1,14 +1,19 @@
+import time
 import pandas as pd
 import pulp
 import numpy as np
 from src.x_pts import calculate_expected_points, predict_future_xPts
 from src.load_data import create_current_team_df, load_fixture_data
 from src.fixture_difficulty import scale_pts_by_difficulty
+from src.transfer_planner import plan_transfers, TRANSFER_EPSILON
 pd.set_option('future.no_silent_downcasting', True)
 
-def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None):
+def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None, fixtures=None, position_coefficients=None, difficulty_factors=None, window=3, feature_store=None):
     """
     Returns a DataFrame of eligible players for a given game week, with additional calculations like average 3-week ICT index and expected points (xPts).
+    Fixtures, position coefficients and difficulty factors default to the current season's and can be passed in by callers
+    that build many game weeks from the same inputs. The ICT form window defaults to 3 game weeks.
+    A RollingFeatureStore fed with the same merged_gw_df replaces the rolling pass over every earlier game week.
     """
     required_columns = {'element_type', 'position', 'element', 'xPts'}
     if not required_columns.issubset(merged_gw_df.columns):
@@ -27,37 +32,32 @@ def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None):
     # Find the latest available gameweek in the data
     max_available_gw = merged_gw_df["GW"].max()
     target_gw = min(gw - 1, max_available_gw)
-    # Calculate how many previous gameweeks we can use
-    available_gws = merged_gw_df[merged_gw_df["GW"] <= target_gw]["GW"].unique()
-    window_size = min(3, len(available_gws))  # Use what's available up to 3 weeks
 
-    # Step 1: Calculate avg_3w_ict ending gw - 1
-    prev_gw_df = merged_gw_df[merged_gw_df["GW"] <= target_gw].copy()
-    
-    # Step 2: Filter the current game week data
-    current_gw_df = prev_gw_df.loc[prev_gw_df.groupby("element")["GW"].idxmax()].copy()
-
-    # Step 3: Calculate the avg_3w_ict
-    prev_gw_df["avg_3w_ict"] = prev_gw_df.groupby("element")["ict_index"].rolling(
-        window=window_size, min_periods=1
-    ).mean().reset_index(level=0, drop=True)
-
-    # Step 4: Filter prev_gw_df to only include rows where both element and GW are in current_gw_df
-    filtered_prev_gw_df = prev_gw_df[
-        prev_gw_df.set_index(["element", "GW"]).index.isin(current_gw_df.set_index(["element", "GW"]).index)
-    ].copy()
-
-    # Step 5: Merge the avg_3w_ict back into the current game week data
-    current_gw_df = pd.merge(
-        current_gw_df,
-        filtered_prev_gw_df[["element", "avg_3w_ict"]],
-        on="element",
-        how="left"
-    )
+    if feature_store is not None and feature_store.window != window:
+        raise ValueError(f"Feature store averages over {feature_store.window} game weeks, not {window}")
+
+    if feature_store is not None:
+        # Steps 1-4 from the incrementally maintained per-player state, folding in only game weeks it has not seen
+        with feature_store.lock:
+            feature_store.update(merged_gw_df, through_gw=target_gw)
+            eligible_df = feature_store.candidates()
+    else:
+        prev_gw_df = merged_gw_df[merged_gw_df["GW"] <= target_gw]
+
+        # Calculate how many previous gameweeks we can use, up to the window
+        window_size = min(window, prev_gw_df["GW"].nunique())
 
-    # Step 6: Filter out rows where avg_3w_ict is NaN or <= 0
-    eligible_df = current_gw_df.dropna(subset=["avg_3w_ict"])
-    eligible_df = eligible_df[eligible_df["avg_3w_ict"] > 0].copy()
+        # Step 1: Take each player's latest game week row
+        current_gw_df = prev_gw_df.loc[prev_gw_df.groupby("element")["GW"].idxmax()]
+
+        # Step 2: Average the ICT index over each player's last window_size rows, which is the final value of the rolling mean
+        avg_3w_ict = prev_gw_df.groupby("element").tail(window_size).groupby("element")["ict_index"].mean().rename("avg_3w_ict")
+
+        # Step 3: Merge the avg_3w_ict into the current game week data
+        current_gw_df = current_gw_df.merge(avg_3w_ict, left_on="element", right_index=True, how="left")
+
+        # Step 4: Filter out rows where avg_3w_ict is NaN or <= 0
+        eligible_df = current_gw_df[current_gw_df["avg_3w_ict"] > 0].reset_index(drop=True)
 
     if latest_data is not None:
         # Convert latest_data into a DataFrame with relevant columns
@@ -72,10 +72,11 @@ def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None):
         # Assign the "value" column as "now_cost"
         eligible_df["value"] = eligible_df["now_cost"]
 
-    fixtures = load_fixture_data(year="2024-25")
+    if fixtures is None:
+        fixtures = load_fixture_data(year="2024-25")
 
     eligible_df = pd.merge(eligible_df, fixtures, on=['GW', 'fixture'], how="left")
-    eligible_df['player_team'] = eligible_df.apply(lambda row: row['team_h'] if row['was_home'] == 1 else row['team_a'], axis=1)
+    eligible_df['player_team'] = np.where(eligible_df['was_home'] == 1, eligible_df['team_h'], eligible_df['team_a'])
 
     gw_fixtures = fixtures[fixtures['GW'] == gw]
     
@@ -97,12 +98,17 @@ def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None):
 
     eligible_df = pd.concat([home_df, away_df], ignore_index=True)
 
-    eligible_df['difficulty'] = eligible_df.apply(
-        lambda row: row['team_h_difficulty_next'] if row['player_team'] == row['team_h_next'] else row['team_a_difficulty_next'], axis=1)
+    eligible_df['difficulty'] = np.where(
+        eligible_df['player_team'] == eligible_df['team_h_next'],
+        eligible_df['team_h_difficulty_next'],
+        eligible_df['team_a_difficulty_next']
+    )
 
     # Step 7: Add xPts for these players
-    position_coefficients = calculate_expected_points()
-    difficulty_factors = scale_pts_by_difficulty()
+    if position_coefficients is None:
+        position_coefficients = calculate_expected_points()
+    if difficulty_factors is None:
+        difficulty_factors = scale_pts_by_difficulty()
     
     # Merge scale_factor based on position and difficulty into eligible_df
     eligible_df = pd.merge(
@@ -112,19 +118,21 @@ def get_eligible_players_for_gw(gw, merged_gw_df, latest_data=None):
         how="left"
     )
 
-    eligible_df["xPts"] = eligible_df.apply(
-        lambda row: round(
-            predict_future_xPts(row["avg_3w_ict"], row["position"], position_coefficients, row["scale_factor"]),
-            2),
-        axis=1
+    eligible_df["xPts"] = predict_future_xPts(
+        eligible_df["avg_3w_ict"].to_numpy(),
+        eligible_df["position"].to_numpy(),
+        position_coefficients,
+        eligible_df["scale_factor"].to_numpy()
     )
 
     return eligible_df
 
 
-def pick_best_squad(player_data, budget=1000, criteria="xPts", prev_squad=None, free_transfers=1, transfer_threshold=4):
+def pick_best_squad(player_data, budget=1000, criteria="xPts", prev_squad=None, free_transfers=1, transfer_threshold=4, horizon=1, gw=None):
     """
     Picks the best squad if there is no previous squad. If a previous squad exists, it suggests transfers to improve the squad.
+    With a horizon above 1, squads and transfers are planned jointly over that many game weeks starting at gw, and the
+    first game week of the plan is returned.
     Returns the full squad, best 11 players, the captain, and the transfers made.
     """
     position_col = 'position' if 'position' in player_data.columns else 'element_type'
@@ -136,13 +144,21 @@ def pick_best_squad(player_data, budget=1000, criteria="xPts", prev_squad=None,
 
     transfers = []  # Initialize transfers list
 
-    if prev_squad is None:
+    if horizon > 1:
+        if gw is None:
+            raise ValueError("gw must be given to plan transfers over a horizon of more than one game week")
+        # Plan over several game weeks and act on the first one
+        current_team = None if prev_squad is None else create_current_team_df(picks_df=prev_squad, player_data=player_data)
+        plan = plan_transfers(player_data, start_gw=gw, horizon=horizon, current_team=current_team, free_transfers=free_transfers,
+                              budget=budget, transfer_penalty=transfer_threshold, cost_column=cost_column)
+        squad, transfers = plan[0]['squad'], plan[0]['transfers']
+    elif prev_squad is None:
         # Pick a new squad
         squad = select_best_squad_ilp(player_data, budget, cost_column, criteria)
     else:
         # Use the handle_transfers function to update the squad
         current_team = create_current_team_df(picks_df=prev_squad, player_data=player_data)
-        squad, transfers = optimize_transfers(current_team, player_data, free_transfers, budget, transfer_penalty=transfer_threshold)
+        squad, transfers = optimize_transfers(current_team, player_data, free_transfers, budget, criteria=criteria, transfer_penalty=transfer_threshold)
 
     # Ensure squad is not None before proceeding
     if squad is None or squad.empty:
@@ -153,144 +169,171 @@ def pick_best_squad(player_data, budget=1000, criteria="xPts", prev_squad=None,
     return squad, best_11, captain, transfers
 
 def select_best_squad_ilp(player_data, budget, cost_column, criteria):
+    build_start = time.perf_counter()
+
     # Define the problem
     prob = pulp.LpProblem("Squad_Selection", pulp.LpMaximize)
 
-    # Decision variables
+    # Decision variables, kept in row order so they line up with the NumPy columns below
     player_vars = pulp.LpVariable.dicts("player", player_data.index, cat='Binary')
+    variables = [player_vars[i] for i in player_data.index]
+    points = player_data[criteria].to_numpy(dtype=float)
+    costs = player_data[cost_column].to_numpy(dtype=float)
 
     # Objective function: Maximize total xPts
-    prob += pulp.lpSum([player_data.loc[i, criteria] * player_vars[i] for i in player_data.index])
+    prob += pulp.LpAffineExpression(zip(variables, points))
 
     # Constraint: Total cost should be less than or equal to budget
-    prob += pulp.lpSum([player_data.loc[i, cost_column] * player_vars[i] for i in player_data.index]) <= budget
+    prob += pulp.LpAffineExpression(zip(variables, costs)) <= budget
 
     # Constraints: Position requirements
     position_limits = {'GK': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+    position_groups = player_data.groupby('position', sort=False, observed=True).indices
     for position, limit in position_limits.items():
-        prob += pulp.lpSum([player_vars[i] for i in player_data.index if player_data.loc[i, 'position'] == position]) == limit
+        members = position_groups.get(position, [])
+        prob += pulp.LpAffineExpression((variables[k], 1) for k in members) == limit
 
     # Constraint: Maximum of 3 players from the same team
-    for team in player_data['team'].unique():
-        prob += pulp.lpSum([player_vars[i] for i in player_data.index if player_data.loc[i, 'team'] == team]) <= 3
+    for members in player_data.groupby('team', sort=False, observed=True).indices.values():
+        prob += pulp.LpAffineExpression((variables[k], 1) for k in members) <= 3
+
+    build_time = time.perf_counter() - build_start
 
     # Solve the problem with suppressed output
+    solve_start = time.perf_counter()
     prob.solve(pulp.PULP_CBC_CMD(msg=False))
+    solve_time = time.perf_counter() - solve_start
 
     # Print the status of the solution
     print("Status:", pulp.LpStatus[prob.status])
+    print(f"ILP build time: {build_time * 1000:.1f} ms, solve time: {solve_time * 1000:.1f} ms")
 
     # Extract the selected players
-    selected_players = [i for i in player_data.index if player_vars[i].varValue == 1]
-    squad = player_data.loc[selected_players]
+    selected = np.array([(var.varValue or 0) > 0.5 for var in variables], dtype=bool)
+    squad = player_data[selected]
 
     return squad
 
-def optimize_transfers(current_team, eligible_players, free_transfers, value, criteria="xPts", transfer_penalty=4):
+def optimize_transfers(current_team, eligible_players, free_transfers, value, criteria="xPts", transfer_penalty=4, max_transfers=None):
     """
     Determine the optimal set of transfers to maximize points gain while considering transfer penalties, budget constraints,
-    and team (club) constraints.
+    and team (club) constraints. The whole "keep the current squad plus at most k changes" problem is solved as one MILP.
 
     Args:
         current_team (pd.DataFrame): DataFrame containing the current team data.
         eligible_players (pd.DataFrame): DataFrame containing eligible players for the gameweek.
         free_transfers (int): Number of free transfers available.
-        transfer_penalty (int): Penalty points for each transfer over the free transfers limit.
+        value (int): Squad budget; the new squad may cost at most this or the current squad cost, whichever is higher.
         criteria (str): The criteria to base the transfers on, typically "xPts".
+        transfer_penalty (int): Penalty points for each transfer over the free transfers limit.
+        max_transfers (int, optional): Upper bound on the number of transfers, unlimited by default.
 
     Returns:
-        pd.DataFrame: Updated squad DataFrame after making optimal transfers.
+        tuple: Updated squad DataFrame after making optimal transfers, and a list of (player_out, player_in) pairs.
     """
-
     # Define cost and name columns for current_team and eligible_players
     current_team_cost_column = "now_cost" if "now_cost" in current_team.columns else "value"
     eligible_players_cost_column = "now_cost" if "now_cost" in eligible_players.columns else "value"
 
-    # Define the team column
-    team_column = "team"
+    # Clubs are identified by the numeric team id, which current players may only carry in the "team" column
+    current_clubs = current_team["player_team"].fillna(current_team["team"]) if "player_team" in current_team.columns else current_team["team"]
+
+    # Candidates are eligible players outside the current squad with usable points and cost
+    candidates = eligible_players[
+        ~np.isin(eligible_players["element"].to_numpy(), current_team["element"].to_numpy())
+        & eligible_players["position"].notna().to_numpy()
+        & eligible_players[criteria].notna().to_numpy()
+        & eligible_players[eligible_players_cost_column].notna().to_numpy()
+    ]
+
+    n_current = len(current_team)
+    points = np.concatenate([
+        current_team[criteria].fillna(0).to_numpy(dtype=float),
+        candidates[criteria].to_numpy(dtype=float)
+    ])
+    costs = np.concatenate([
+        current_team[current_team_cost_column].fillna(0).to_numpy(dtype=float),
+        candidates[eligible_players_cost_column].to_numpy(dtype=float)
+    ])
+    positions = np.concatenate([current_team["position"].to_numpy(), candidates["position"].to_numpy()])
+    clubs = np.concatenate([current_clubs.to_numpy(), candidates["player_team"].to_numpy()])
 
-    # Estimating potential transfers
-    potential_transfers = []
-    for _, player_out in current_team.iterrows():
-        possible_replacements = eligible_players[
-            (eligible_players['position'] == player_out['position']) & 
-            (eligible_players[criteria] > player_out[criteria]) & 
-            (~eligible_players['element'].isin(current_team['element']))
-        ]
+    # Calculate the current squad cost and set the maximum budget
+    current_cost = costs[:n_current].sum()
+    budget = max(value, current_cost)
+    print(f"Current Squad Cost: {value}")
 
-        for _, player_in in possible_replacements.iterrows():
-            net_points_gain = player_in[criteria] - player_out[criteria]
-            potential_transfers.append((player_out, player_in, net_points_gain))
+    build_start = time.perf_counter()
+    prob = pulp.LpProblem("Transfer_Selection", pulp.LpMaximize)
 
-    # Sort potential transfers by net_points_gain in descending order
-    potential_transfers = sorted(potential_transfers, key=lambda x: x[2], reverse=True)
+    # One binary per player: kept or bought. Selling a current player means leaving its variable at 0
+    variables = [pulp.LpVariable(f"player_{k}", cat='Binary') for k in range(len(points))]
+    incoming = pulp.LpAffineExpression((variables[k], 1) for k in range(n_current, len(points)))
+    hits = pulp.LpVariable("hits", lowBound=0, cat='Integer')
 
-    # Calculate the current squad cost and set the maximum budget
-    print(f"Current Squad Cost: {value}")
+    # Objective function: Maximize squad xPts minus the penalty for transfers beyond the free ones
+    prob += pulp.LpAffineExpression(zip(variables, points)) - transfer_penalty * hits - TRANSFER_EPSILON * incoming
 
-    # Knapsack algorithm to maximize points gain considering transfer penalties and budget constraints
-    n = len(potential_transfers)
-    dp = np.zeros((n + 1, 2 * free_transfers + 1))
-    budget_used = np.zeros((n + 1, 2 * free_transfers + 1))
-
-    # Track the number of players from each team in the squad
-    team_counts = current_team[team_column].value_counts().to_dict()
-
-    for i in range(1, n + 1):
-        player_out, player_in, point_gain = potential_transfers[i - 1]
-        transfer_cost = 1  # One transfer used
-        for j in range(2 * free_transfers + 1):
-            if j >= transfer_cost:
-                new_team_count = team_counts.get(player_in[team_column], 0) + 1
-                if new_team_count <= 3:
-                    if dp[i][j] < dp[i - 1][j - transfer_cost] + point_gain - (j - free_transfers) * transfer_penalty:
-                        dp[i][j] = dp[i - 1][j - transfer_cost] + point_gain - (j - free_transfers) * transfer_penalty
-                        budget_used[i][j] = budget_used[i - 1][j - transfer_cost] + player_in[eligible_players_cost_column] - player_out[current_team_cost_column]
-            else:
-                dp[i][j] = dp[i - 1][j]
-                budget_used[i][j] = budget_used[i - 1][j]
-
-    # Traceback to find optimal transfers
-    optimal_transfers = []
-    w = 2 * free_transfers
-    for i in range(n, 0, -1):
-        if dp[i][w] != dp[i - 1][w]:
-            player_out, player_in, _ = potential_transfers[i - 1]
-            optimal_transfers.append((player_out, player_in))
-            w -= 1
-
-    # Remove duplicate entries in optimal_transfers without converting to a dictionary
-    seen_players = set()
-    unique_transfers = []
-    for player_out, player_in in optimal_transfers:
-        if player_out['element'] not in seen_players:
-            unique_transfers.append((player_out, player_in))
-            seen_players.add(player_out['element'])
-    optimal_transfers = unique_transfers
+    prob += hits >= incoming - free_transfers
+    if max_transfers is not None:
+        prob += incoming <= max_transfers
 
-    # Ensure final budget after all transfers is within the max budget
-    final_cost = value
-    for player_out, player_in in optimal_transfers:
-        final_cost = final_cost - player_out[current_team_cost_column] + player_in[eligible_players_cost_column]
-
-    if final_cost <= value:
-        # Update the current team with the optimal transfers
-        for player_out, player_in in optimal_transfers:
-            print(f"Transfer {player_out['name']} to {player_in['name']}")
-            current_team = current_team[current_team['element'] != player_out['element']]  # Remove old player
-            current_team = pd.concat([current_team, player_in.to_frame().T])  # Add new player
+    # Constraint: New squad cost must stay within budget
+    prob += pulp.LpAffineExpression(zip(variables, costs)) <= budget
+
+    # Constraints: Keep the current squad's position quotas
+    position_quotas = current_team["position"].value_counts().to_dict()
+    for position, members in pd.Series(positions).groupby(positions, sort=False).indices.items():
+        prob += pulp.LpAffineExpression((variables[k], 1) for k in members) == position_quotas.get(position, 0)
+
+    # Constraint: Maximum of 3 players from the same club
+    for members in pd.Series(clubs).groupby(clubs, sort=False).indices.values():
+        prob += pulp.LpAffineExpression((variables[k], 1) for k in members) <= 3
+
+    build_time = time.perf_counter() - build_start
+
+    solve_start = time.perf_counter()
+    prob.solve(pulp.PULP_CBC_CMD(msg=False))
+    solve_time = time.perf_counter() - solve_start
+
+    print("Status:", pulp.LpStatus[prob.status])
+    print(f"ILP build time: {build_time * 1000:.1f} ms, solve time: {solve_time * 1000:.1f} ms")
+
+    optimal_transfers = []
+    if pulp.LpStatus[prob.status] == "Optimal":
+        selected = np.array([(var.varValue or 0) > 0.5 for var in variables], dtype=bool)
+        players_out = current_team[~selected[:n_current]]
+        players_in = candidates[selected[n_current:]]
+
+        # Pair outgoing and incoming players by position so each transfer is like for like. Pairing both sides in
+        # rank order makes every pair a gain whenever any like-for-like pairing can; a pair that still loses points
+        # is a downgrade that frees budget for another transfer
+        for position in players_out["position"].unique():
+            outs = players_out[players_out["position"] == position].sort_values(by=criteria, kind="stable")
+            ins = players_in[players_in["position"] == position].sort_values(by=criteria, kind="stable")
+            for (_, player_out), (_, player_in) in zip(outs.iterrows(), ins.iterrows()):
+                optimal_transfers.append((player_out, player_in))
     else:
         print("No valid transfers found within the budget constraint.")
-        optimal_transfers = []
+
+    # Update the current team with the optimal transfers
+    for player_out, player_in in optimal_transfers:
+        print(f"Transfer {player_out.get('name')} to {player_in.get('name')}")
+    if optimal_transfers:
+        players_out_ids = [player_out['element'] for player_out, _ in optimal_transfers]
+        current_team = pd.concat([
+            current_team[~current_team['element'].isin(players_out_ids)],
+            pd.DataFrame([player_in for _, player_in in optimal_transfers])
+        ])
 
     print(f"Final Squad Cost: {current_team[current_team_cost_column].sum()}")
-    
+
     # Convert the float values of player team to int
     current_team['player_team'] = current_team['player_team'].fillna(0).astype(int)
-    
+
     # Merge 'team' column into 'player_team'
-    current_team['player_team'] = current_team.apply(lambda row: row['team'] if row['player_team'] == 0 else row['player_team'], axis=1)
-    
+    current_team['player_team'] = np.where(current_team['player_team'] == 0, current_team['team'], current_team['player_team'])
+
     return current_team, optimal_transfers
 
 def select_best_11(squad, criteria="xPts"):
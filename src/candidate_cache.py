@@ -0,0 +1,112 @@
+import threading
+from src.single_flight import single_flight
+from src.build_squad import get_eligible_players_for_gw
+from src.load_data import load_and_filter_data, get_bootstrap_snapshot
+from src.feature_store import get_feature_store, save_feature_store
+
+# Tables are kept for the current and the previous data version only, the previous one is served while rebuilding
+MAX_VERSIONS = 2
+
+_tables = {}
+_versions = []
+_building = set()
+_lock = threading.Lock()
+
+
+def _build_table(season, gw, snapshot, min_gw, min_minutes):
+    """
+    Builds the eligible-player table for a season and game week and stores it under the snapshot's data version.
+    """
+    version = snapshot.version
+    fpl_data = load_and_filter_data(year=season, min_minutes=min_minutes, min_gw=min_gw)
+    latest_data = snapshot.elements
+
+    # The feature store persists between data versions, so a new game week only updates the players it touches
+    store_name = f"{season}-{min_gw}-{min_minutes}"
+    feature_store = get_feature_store(store_name)
+    with feature_store.lock:
+        through_gw, players = feature_store.through_gw, len(feature_store.elements)
+        table = get_eligible_players_for_gw(gw=gw, merged_gw_df=fpl_data, latest_data=latest_data, feature_store=feature_store)
+        if (feature_store.through_gw, len(feature_store.elements)) != (through_gw, players):
+            save_feature_store(store_name, feature_store)
+
+    with _lock:
+        _evict_old_versions(version)
+        # A slow build for an older version must not replace a table built for a newer one
+        key = (season, gw, min_gw, min_minutes)
+        cached = _tables.get(key)
+        if version in _versions and (cached is None or _versions.index(cached[0]) <= _versions.index(version)):
+            _tables[key] = (version, table)
+
+    return table
+
+
+def _evict_old_versions(version):
+    """
+    Records a data version as seen and drops tables built for versions older than the newest MAX_VERSIONS, ordered by
+    the bootstrap file's modification time. Must be called with _lock held.
+    """
+    if version not in _versions:
+        _versions.append(version)
+        _versions.sort(key=lambda seen: seen[1])
+        del _versions[:-MAX_VERSIONS]
+    for key in [key for key, (table_version, _) in _tables.items() if table_version not in _versions]:
+        del _tables[key]
+
+
+def _build_in_background(season, gw, snapshot, min_gw, min_minutes):
+    key = (season, gw, min_gw, min_minutes)
+    try:
+        single_flight(("candidates", key, snapshot.version), _build_table, season, gw, snapshot, min_gw, min_minutes)
+    except Exception as e:
+        print(f"Background rebuild of eligible players for {season} GW{gw} failed: {str(e)}")
+    finally:
+        with _lock:
+            _building.discard(key)
+
+
+def get_cached_eligible_players(season="2024-25", gw=None, min_gw=5, min_minutes=60, fresh=False):
+    """
+    Returns the eligible-player table for a season and game week, building it at most once per data version.
+
+    When the data version changes and a table for the same season and game week already exists, the stale
+    table keeps being served while a replacement is built in a background thread, unless fresh is set.
+
+    :param season: Premier League Season
+    :param gw: The game week to build candidates for, defaults to the next game week
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :param fresh: Wait for a table built from the current data version instead of serving a stale one, for results
+        that are cached under the current version themselves
+    :return: A shallow copy of the cached DataFrame, so callers can add columns without touching the cache
+    """
+    snapshot = get_bootstrap_snapshot()
+    gw = snapshot.gameweek if gw is None else gw
+    version = snapshot.version
+    key = (season, gw, min_gw, min_minutes)
+
+    with _lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] != version and not fresh and key not in _building:
+            _building.add(key)
+            threading.Thread(
+                target=_build_in_background,
+                args=(season, gw, snapshot, min_gw, min_minutes),
+                daemon=True
+            ).start()
+
+    if cached is not None and (cached[0] == version or not fresh):
+        return cached[1].copy(deep=False)
+
+    # Concurrent requests for a version share one build, including a background rebuild already under way
+    table = single_flight(("candidates", key, version), _build_table, season, gw, snapshot, min_gw, min_minutes)
+    return table.copy(deep=False)
+
+
+def clear_cached_eligible_players():
+    """
+    Drops every cached eligible-player table.
+    """
+    with _lock:
+        _tables.clear()
+        _versions.clear()
@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from src.single_flight import single_flight
+
+_build_lock = threading.Lock()
+
+
+def get_store_dir(csv_path):
+    """
+    Returns the directory holding the columnar copy of a CSV file, stored next to it so it is cleaned up with it.
+    """
+    return f"{csv_path}.columns"
+
+
+def is_store_fresh(store_dir, source_path):
+    """
+    Returns whether a column store exists and was written from the current contents of its source file.
+    """
+    meta_path = os.path.join(store_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r") as meta_file:
+        meta = json.load(meta_file)
+    stat = os.stat(source_path)
+    return meta["source_size"] == stat.st_size and meta["source_mtime_ns"] == stat.st_mtime_ns
+
+
+def write_column_store(df, store_dir, source_path, source_stat=None):
+    """
+    Writes each column of a DataFrame as a NumPy array so later loads can memory-map only the columns they need.
+    Text and categorical columns are stored as integer codes plus a list of categories.
+
+    :param df: DataFrame to store
+    :param store_dir: Directory to write, replaced atomically if it exists
+    :param source_path: File the frame was derived from, whose size and mtime mark the store as fresh
+    :param source_stat: os.stat of source_path taken before it was read, taken now by default
+    :return: Path of the column store directory
+    """
+    stat = source_stat or os.stat(source_path)
+
+    # Write into a private directory first so readers never see a partial store
+    temp_dir = f"{store_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(temp_dir, exist_ok=True)
+
+    columns = {}
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        file_name = f"{position}.npy"
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            np.save(os.path.join(temp_dir, file_name), values.to_numpy())
+            columns[column] = {"file": file_name, "kind": "values"}
+        else:
+            codes, categories = pd.factorize(values)
+            np.save(os.path.join(temp_dir, file_name), codes.astype(np.int32))
+            columns[column] = {"file": file_name, "kind": "codes", "categories": [str(category) for category in categories]}
+
+    with open(os.path.join(temp_dir, "meta.json"), "w") as meta_file:
+        json.dump({
+            "rows": len(df),
+            "columns": columns,
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns
+        }, meta_file)
+
+    with _build_lock:
+        if os.path.exists(store_dir):
+            shutil.rmtree(store_dir, ignore_errors=True)
+        os.replace(temp_dir, store_dir)
+
+    return store_dir
+
+
+def build_column_store(csv_path, **read_csv_kwargs):
+    """
+    Parses a CSV file once and writes it as a column store next to it.
+
+    :param csv_path: Path of the CSV file
+    :param read_csv_kwargs: Extra arguments passed to pd.read_csv
+    :return: Path of the column store directory
+    """
+    stat = os.stat(csv_path)
+    df = pd.read_csv(csv_path, **read_csv_kwargs)
+    store_dir = write_column_store(df, get_store_dir(csv_path), csv_path, source_stat=stat)
+    print(f"Column store written to {store_dir}")
+    return store_dir
+
+
+def _cast_values(values, dtype):
+    """
+    Casts a stored numeric column to a target dtype, keeping the stored type when the values would not fit.
+    """
+    target = np.dtype(dtype)
+    if target.kind == "f":
+        return values.astype(target)
+    if target.kind in "iu":
+        if values.dtype.kind == "f" and np.isnan(values).any():
+            return values.astype(np.float32)
+        if len(values) == 0:
+            return values.astype(target)
+        info = np.iinfo(target)
+        if values.min() >= info.min and values.max() <= info.max:
+            return values.astype(target)
+    return np.array(values)
+
+
+def read_column_store(store_dir, columns=None, dtypes=None):
+    """
+    Loads columns from a column store, memory-mapping numeric columns.
+
+    :param store_dir: Path of the column store directory
+    :param columns: Columns to load, all columns by default
+    :param dtypes: Optional mapping of column name to target dtype. "category" turns stored text codes straight into
+        a Categorical; numeric dtypes are applied when the values fit.
+    :return: DataFrame with the requested columns in file order
+    """
+    dtypes = dtypes or {}
+    with open(os.path.join(store_dir, "meta.json"), "r") as meta_file:
+        meta = json.load(meta_file)
+
+    wanted = set(meta["columns"] if columns is None else columns)
+    missing = wanted - set(meta["columns"])
+    if missing:
+        raise KeyError(f"Columns not found in {store_dir}: {sorted(missing)}")
+
+    data = {}
+    for column, info in meta["columns"].items():
+        if column not in wanted:
+            continue
+        values = np.load(os.path.join(store_dir, info["file"]), mmap_mode="r")
+        dtype = dtypes.get(column)
+        if info["kind"] == "codes":
+            if dtype == "category" and len(set(info["categories"])) == len(info["categories"]):
+                values = pd.Categorical.from_codes(np.asarray(values), info["categories"])
+            else:
+                # Code -1 marks a missing value and picks the trailing NaN
+                categories = np.array(info["categories"] + [np.nan], dtype=object)
+                values = categories[values]
+        elif dtype is not None and dtype != "category":
+            values = _cast_values(values, dtype)
+        data[column] = values
+
+    return pd.DataFrame(data)
+
+
+def ensure_column_store(csv_path, **read_csv_kwargs):
+    """
+    Builds the column store of a CSV file if it is missing or older than the CSV. Concurrent callers for the same
+    file share a single build.
+
+    :param csv_path: Path of the CSV file
+    :param read_csv_kwargs: Extra arguments passed to pd.read_csv when the store is built
+    :return: Path of the column store directory
+    """
+    store_dir = get_store_dir(csv_path)
+
+    def build():
+        if not is_store_fresh(store_dir, csv_path):
+            build_column_store(csv_path, **read_csv_kwargs)
+        return store_dir
+
+    return single_flight(("column_store", store_dir), build)
+
+
+def load_csv_columns(csv_path, columns=None, dtypes=None, **read_csv_kwargs):
+    """
+    Loads a CSV file through its column store, building the store on first use or when the CSV has changed.
+
+    :param csv_path: Path of the CSV file
+    :param columns: Columns to load, all columns by default
+    :param dtypes: Optional mapping of column name to target dtype, see read_column_store
+    :param read_csv_kwargs: Extra arguments passed to pd.read_csv when the store is built
+    :return: DataFrame with the requested columns
+    """
+    return read_column_store(ensure_column_store(csv_path, **read_csv_kwargs), columns, dtypes)
@@ -1,9 +1,61 @@
+import argparse
+import numpy as np
 from src.load_data import load_and_filter_all_seasons_data
-from src.x_pts import calculate_expected_points
-
-
-def find_top_coefficients_by_position(min_gw=10, min_minutes=60):
-    df = load_and_filter_all_seasons_data(min_gw=min_gw, min_minutes=min_minutes)
+from src.form_features import build_form_features, shifted_rolling_means
+
+POSITIONS = {
+    'GK': 'Goalkeepers',
+    'DEF': 'Defenders',
+    'MID': 'Midfielders',
+    'FWD': 'Forwards'
+}
+
+
+def fit_single_feature_regressions(features, target):
+    """
+    Fits target = coef * feature + intercept for every feature column at once from closed-form sums, using only the
+    rows where that feature is neither NaN nor 0, as fit_expected_points does after add_rolling_average.
+
+    :param features: 2-D float array, one column per feature
+    :param target: 1-D float array
+    :return: Dictionary of 1-D arrays "coef", "intercept", "r2" and "samples", one entry per feature
+    """
+    valid = ~np.isnan(features) & (features != 0)
+    samples = valid.sum(axis=0)
+    safe_samples = np.maximum(samples, 1)
+
+    target = np.asarray(target, dtype=np.float64)[:, None]
+    x_mean = np.where(valid, features, 0.0).sum(axis=0) / safe_samples
+    y_mean = np.where(valid, target, 0.0).sum(axis=0) / safe_samples
+
+    # Centred sums keep the precision of a two-pass fit
+    dx = np.where(valid, features - x_mean, 0.0)
+    dy = np.where(valid, target - y_mean, 0.0)
+    sxx = (dx * dx).sum(axis=0)
+    sxy = (dx * dy).sum(axis=0)
+    syy = (dy * dy).sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coef = np.where(sxx > 0, sxy / sxx, 0.0)
+        r2 = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), np.where(syy > 0, 0.0, 1.0))
+    intercept = y_mean - coef * x_mean
+
+    return {"coef": coef, "intercept": intercept, "r2": r2, "samples": samples}
+
+
+def find_top_coefficients_by_position(min_gw=10, min_minutes=60, df=None):
+    """
+    Screens every numeric column as a predictor of game week points for each position. For each column the previous
+    3 game weeks' average is regressed on points, as calculate_expected_points does, but all columns are averaged
+    in one grouped pass and all regressions are solved together.
+
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :param df: Preloaded game week data, load_and_filter_all_seasons_data by default
+    :return: Dictionary of position to {column: (abs(coef), coef, intercept, rows with data, r2, regression samples)}
+    """
+    if df is None:
+        df = load_and_filter_all_seasons_data(min_gw=min_gw, min_minutes=min_minutes)
 
     # Ensure the data is sorted by player (element) and game week (GW)
     df = df.sort_values(by=["element", "GW"])
@@ -11,59 +63,100 @@ def find_top_coefficients_by_position(min_gw=10, min_minutes=60):
     # Filter out players who have not played any minutes in a game week
     df = df[df["minutes"] > 0]
 
+    candidate_columns = [column for column in df.select_dtypes(include='number').columns
+                         if column not in ["element", "GW", "total_points"]]
+
     # Dictionary to store top coefficients by position
     coefficients_by_position = {}
 
-    # Define the positions to iterate over
-    positions = {
-        'GK': 'Goalkeepers',
-        'DEF': 'Defenders',
-        'MID': 'Midfielders',
-        'FWD': 'Forwards'
-    }
-
-    # Iterate over each position
-    for position_code, position_name in positions.items():
-        # Create a copy of the filtered position data
-        position_df = df[df['position'] == position_code].copy()
+    for position_code, position_name in POSITIONS.items():
+        position_df = df[df['position'] == position_code]
 
         # Check if there's enough data for the position
         if position_df.empty:
             print(f"\nSkipping {position_name} due to insufficient data.")
             continue
 
-        # Dictionary to store coefficients for this position
+        # Skip columns with fewer than 500 rows of data
+        row_counts = position_df[candidate_columns].count()
+        columns = [column for column in candidate_columns if row_counts[column] >= 500]
+        for column in candidate_columns:
+            if column not in columns:
+                print(f"Skipping column '{column}' for {position_name} due to insufficient data (< 500 rows).")
+
+        features = shifted_rolling_means(position_df[columns].to_numpy(dtype=np.float64),
+                                         position_df["element"].to_numpy())
+        fits = fit_single_feature_regressions(features, position_df["total_points"].to_numpy(dtype=np.float64))
+
         coefficients = {}
+        for index, column in enumerate(columns):
+            if fits["samples"][index] == 0:
+                print(f"Skipping column '{column}' for {position_name} due to insufficient data or model training issues.")
+                continue
+            coef = float(fits["coef"][index])
+            coefficients[column] = (
+                abs(coef), coef, float(fits["intercept"][index]), int(row_counts[column]),
+                float(fits["r2"][index]), int(fits["samples"][index])
+            )
+
+        coefficients_by_position[position_code] = coefficients
 
-        # Iterate over each numeric column (excluding 'element', 'GW', and 'total_points')
-        for column in position_df.select_dtypes(include=['float64', 'int64']).columns:
-            if column not in ["element", "GW", "total_points"]:
-                # Skip columns with fewer than 500 rows of data
-                if position_df[column].count() < 500:
-                    print(f"Skipping column '{column}' for {position_name} due to insufficient data (< 500 rows).")
-                    continue
+    # Return the results after processing all positions
+    return coefficients_by_position
 
-                # Use calculate_expected_points for each column as criteria
-                coefficients_data = calculate_expected_points(position_df, criteria=column)
+def find_top_form_features_by_position(min_gw=10, min_minutes=60, columns=None, windows=(3, 5, 8), halflives=(2, 4),
+                                       df=None):
+    """
+    Screens form features, several rolling windows and EWMA half-lives of each stat, as predictors of game week
+    points for each position. The feature matrix is built once by build_form_features and every feature is fitted
+    at once per position.
+
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :param columns: Stats to build form for, see build_form_features
+    :param windows: Rolling window sizes in game weeks
+    :param halflives: EWMA half-lives in game weeks
+    :param df: Preloaded game week data, load_and_filter_all_seasons_data by default
+    :return: Dictionary of position to {feature: (abs(coef), coef, intercept, rows with data, r2, regression samples)}
+    """
+    if df is None:
+        df = load_and_filter_all_seasons_data(min_gw=min_gw, min_minutes=min_minutes)
 
-                # Ensure the coefficients data contains the required position
-                if position_code in coefficients_data:
-                    coef = coefficients_data[position_code]["coef"]
-                    intercept = coefficients_data[position_code]["intercept"]
-                    points_trained = position_df[column].count()
+    df = df[df["minutes"] > 0]
+    features = build_form_features(df, columns, windows, halflives)
+    positions = df["position"].astype(str).reindex(features.index).to_numpy()
+    target = df["total_points"].reindex(features.index).to_numpy(dtype=np.float64)
 
-                    # Store the coefficients and points trained for this column
-                    coefficients[column] = (abs(coef), coef, intercept, points_trained)
-                else:
-                    print(
-                        f"Skipping column '{column}' for {position_name} due to insufficient data or model training issues.")
+    coefficients_by_position = {}
+    for position_code in POSITIONS:
+        in_position = positions == position_code
+        if not in_position.any():
+            continue
+        values = features.to_numpy()[in_position].astype(np.float64)
+        fits = fit_single_feature_regressions(values, target[in_position])
 
-            # Store all coefficients for this position
-            coefficients_by_position[position_code] = coefficients
+        coefficients = {}
+        for index, column in enumerate(features.columns):
+            if fits["samples"][index] == 0:
+                continue
+            coef = float(fits["coef"][index])
+            coefficients[column] = (
+                abs(coef), coef, float(fits["intercept"][index]), int((~np.isnan(values[:, index])).sum()),
+                float(fits["r2"][index]), int(fits["samples"][index])
+            )
+        coefficients_by_position[position_code] = coefficients
 
-    # Return the results after processing all positions
     return coefficients_by_position
 
 # Example usage
 if __name__ == "__main__":
-    find_top_coefficients_by_position()
+    parser = argparse.ArgumentParser(description="Screen game week columns as predictors of points by position.")
+    parser.add_argument("--form", action="store_true",
+                        help="Screen rolling-window and EWMA form features instead of each column's 3-week average")
+    args = parser.parse_args()
+
+    scan = find_top_form_features_by_position if args.form else find_top_coefficients_by_position
+    for position, coefficients in scan().items():
+        print(f"\n{POSITIONS[position]}")
+        for column, (_, coef, intercept, rows, r2, samples) in sorted(coefficients.items(), key=lambda item: -item[1][4])[:10]:
+            print(f"  {column:<30} coef {coef:8.4f}  intercept {intercept:8.4f}  R2 {r2:.4f}  n {samples}")
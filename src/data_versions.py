@@ -0,0 +1,102 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from src.atomic_io import atomic_write
+
+_readers = {}
+_lock = threading.Lock()
+
+
+def get_fpl_data_dir():
+    """
+    Returns the fpl-data directory at the project root, or the FPL_DATA_DIR environment variable when set.
+    """
+    if os.environ.get("FPL_DATA_DIR"):
+        return os.environ["FPL_DATA_DIR"]
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(project_root, "fpl-data")
+
+
+def get_current_version():
+    """
+    Returns the data version requests should read. This is the version published by the background refresher when
+    there is one, and today's date otherwise, in which case files are downloaded on first use.
+
+    :return: Version name, which is also the name of its folder inside fpl-data
+    """
+    pointer_path = os.path.join(get_fpl_data_dir(), "CURRENT")
+    try:
+        with open(pointer_path, "r") as pointer_file:
+            version = pointer_file.read().strip()
+        if version and os.path.isdir(os.path.join(get_fpl_data_dir(), version)):
+            return version
+    except FileNotFoundError:
+        pass
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def get_version_dir(version=None):
+    """
+    Returns the folder holding a data version, the current one by default.
+    """
+    return os.path.join(get_fpl_data_dir(), version or get_current_version())
+
+
+@contextmanager
+def pin_version(version=None):
+    """
+    Keeps a data version from being removed while the caller reads from it.
+
+    :param version: Version to pin, the current one by default
+    :return: Context manager yielding the pinned version name
+    """
+    with _lock:
+        version = version or get_current_version()
+        _readers[version] = _readers.get(version, 0) + 1
+    try:
+        yield version
+    finally:
+        with _lock:
+            _readers[version] -= 1
+            if _readers[version] == 0:
+                del _readers[version]
+
+
+def publish_version(version):
+    """
+    Atomically points readers at a fully written data version.
+
+    :param version: Name of a folder inside fpl-data
+    """
+    with atomic_write(os.path.join(get_fpl_data_dir(), "CURRENT"), "w") as pointer_file:
+        pointer_file.write(version)
+    print(f"Published data version {version}")
+
+
+def remove_stale_versions():
+    """
+    Deletes data versions other than the current one that no reader in this process is using.
+    The models and cache folders, the CURRENT pointer and in-progress staging folders are never touched.
+    """
+    fpl_data_dir = get_fpl_data_dir()
+    if not os.path.isdir(fpl_data_dir):
+        return
+
+    with _lock:
+        keep = {get_current_version(), "models", "cache", "CURRENT", *_readers}
+
+        for item in os.listdir(fpl_data_dir):
+            if item in keep or item.startswith(".") or item.endswith(".tmp"):
+                continue
+            item_path = os.path.join(fpl_data_dir, item)
+            try:
+                if os.path.isdir(item_path):
+                    shutil.rmtree(item_path)
+                    print(f"Deleted old folder: {item_path}")
+                else:
+                    os.remove(item_path)
+                    print(f"Deleted old file: {item}")
+            except Exception as e:
+                print(f"Error deleting file or folder {item}: {str(e)}")
@@ -0,0 +1,233 @@
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from src.atomic_io import atomic_write, load_pickle
+from src.model_store import get_models_dir
+from src.form_features import group_layout
+
+_stores = {}
+_lock = threading.Lock()
+
+
+class RollingFeatureStore:
+    """
+    Per-player rolling state for one season: each player's last window values of a feature and their latest game
+    week row (team, fixture, value and so on). Game weeks are folded in as they arrive, so building the candidate
+    table for the next game week reads one row per player instead of re-rolling the whole season.
+
+    Produces the same rows and averages as steps 1-4 of get_eligible_players_for_gw: the latest row is the first row
+    of each player's latest game week, and the average covers the player's last rows, up to the window or the
+    number of game weeks seen if that is smaller.
+
+    :param window: Number of rows the rolling average covers
+    :param feature: Column averaged, "ict_index" by default
+    :param column: Name of the average column in the candidate table
+    """
+    def __init__(self, window=3, feature="ict_index", column="avg_3w_ict"):
+        self.window = window
+        self.feature = feature
+        self.column = column
+        self.through_gw = 0
+        self.rows_at_last_gw = 0
+        self.gameweeks = set()
+        self.elements = pd.Index([], dtype=np.int64)
+        self.recent = np.full((0, window), np.nan)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.latest = None
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def _reset(self):
+        lock = self.lock
+        self.__init__(self.window, self.feature, self.column)
+        self.lock = lock
+
+    def update(self, df, through_gw=None):
+        """
+        Folds game week rows into the store. Only players with rows after the stored game week, and players not
+        seen before, are touched. If earlier game weeks changed underneath the store it is rebuilt.
+
+        :param df: Game week rows in file order, e.g. a season's filtered merged_gw data
+        :param through_gw: Last game week to include, the latest in df by default
+        :return: Number of players updated
+        """
+        stream, through_gw = self.new_rows(df, through_gw)
+        return self.fold(stream, through_gw, df)
+
+    def new_rows(self, df, through_gw=None):
+        """
+        Returns the rows of df the store has not folded in yet: rows after the stored game week up to through_gw,
+        and every row of players not seen before, such as players who only now pass an eligibility filter. If rows
+        of known players at the stored game week changed, or through_gw goes back, the store is reset first and
+        every row up to through_gw is returned.
+
+        :param df: Game week rows in file order
+        :param through_gw: Last game week to include, the latest in df by default
+        :return: (rows in file order, through_gw)
+        """
+        gw_values = df["GW"].to_numpy()
+        through_gw = int(gw_values.max()) if through_gw is None else int(through_gw)
+        element_values = df["element"].to_numpy()
+        known = np.isin(element_values, self.elements.to_numpy())
+
+        # Rows for the stored game week changing, or the data going back in time, cannot be applied on top
+        if self.through_gw and (through_gw < self.through_gw or
+                                int(((gw_values == self.through_gw) & known).sum()) != self.rows_at_last_gw):
+            self._reset()
+            known = np.zeros(len(df), dtype=bool)
+
+        new_rows = (gw_values > self.through_gw) & (gw_values <= through_gw)
+        return df[new_rows | (~known & (gw_values <= through_gw))], through_gw
+
+    def fold(self, stream, through_gw, df):
+        """
+        Folds rows returned by new_rows into the store.
+
+        :param stream: Output of new_rows
+        :param through_gw: Last game week the stream covers
+        :param df: The frame new_rows was given, used to count the rows at the last game week
+        :return: Number of players updated
+        """
+        if stream.empty:
+            return 0
+
+        # Group the rows by player, keeping file order within each player
+        stream_elements = stream["element"].to_numpy()
+        stream_gws = stream["GW"].to_numpy()
+        positions = np.arange(len(stream))
+        order = np.lexsort((positions, stream_elements))
+        sorted_elements = stream_elements[order]
+        is_start = np.r_[True, sorted_elements[1:] != sorted_elements[:-1]]
+        group = np.cumsum(is_start) - 1
+        group_starts = np.flatnonzero(is_start)
+        group_ends = np.r_[group_starts[1:], len(order)]
+        updated = sorted_elements[group_starts]
+
+        new_elements = pd.Index(updated).difference(self.elements)
+        if len(new_elements):
+            self.elements = self.elements.append(new_elements)
+            self.recent = np.vstack([self.recent, np.full((len(new_elements), self.window), np.nan)])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new_elements), dtype=np.int64)])
+
+        # Only each player's last window rows can still be in the window afterwards, shifted in oldest first
+        values = stream[self.feature].to_numpy(dtype=np.float64)[order]
+        slots = self.elements.get_indexer(sorted_elements)
+        rows_left = group_ends[group] - np.arange(len(order))
+        for remaining in range(min(self.window, int(rows_left.max())), 0, -1):
+            selected = rows_left == remaining
+            rank_slots = slots[selected]
+            self.recent[rank_slots, :-1] = self.recent[rank_slots, 1:]
+            self.recent[rank_slots, -1] = values[selected]
+            self.counts[rank_slots] = np.minimum(self.counts[rank_slots] + 1, self.window)
+
+        # The latest row is the first row of each player's latest game week
+        latest_order = np.lexsort((positions, -stream_gws.astype(np.int64), stream_elements))
+        latest_positions = latest_order[np.r_[True, stream_elements[latest_order][1:] != stream_elements[latest_order][:-1]]]
+        latest_rows = stream.iloc[latest_positions].set_index("element", drop=False)
+        if self.latest is None or len(updated) == len(self.elements):
+            self.latest = latest_rows
+        else:
+            self.latest = pd.concat([self.latest.drop(latest_rows.index, errors="ignore"), latest_rows]).sort_index()
+
+        self.gameweeks.update(np.unique(stream["GW"].to_numpy()).tolist())
+        self.through_gw = max(self.through_gw, through_gw)
+        self.rows_at_last_gw = int((df["GW"].to_numpy() == self.through_gw).sum())
+        return len(updated)
+
+    def preceding_means(self, stream):
+        """
+        Returns, for each row of a stream from new_rows, the mean of the feature over the player's previous window
+        rows, taken from the store and from the player's earlier rows in the stream. This is the shifted rolling
+        average add_rolling_average gives the same rows, computed without the player's older history.
+
+        :param stream: Output of new_rows, before it is folded
+        :return: float64 array aligned to the stream's rows, NaN where the player has no earlier value
+        """
+        elements = stream["element"].to_numpy()
+        order = np.lexsort((np.arange(len(stream)), elements))
+        values = stream[self.feature].to_numpy(dtype=np.float64)[order]
+        sorted_elements = elements[order]
+        rank, _ = group_layout(sorted_elements)
+        slots = self.elements.get_indexer(sorted_elements)
+        stored = np.zeros(len(order), dtype=np.int64)
+        stored[slots >= 0] = self.counts[slots[slots >= 0]]
+
+        totals = np.zeros(len(order))
+        present = np.zeros(len(order))
+        for offset in range(1, self.window + 1):
+            previous = np.full(len(order), np.nan)
+            in_stream = np.flatnonzero(rank >= offset)
+            previous[in_stream] = values[in_stream - offset]
+
+            # Rows further back than the stream come from the stored window, newest value last
+            back = offset - rank
+            in_store = np.flatnonzero((rank < offset) & (back <= stored))
+            previous[in_store] = self.recent[slots[in_store], self.window - back[in_store]]
+
+            valid = ~np.isnan(previous)
+            totals += np.where(valid, previous, 0.0)
+            present += valid
+
+        means = np.empty(len(order))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[order] = np.where(present > 0, totals / present, np.nan)
+        return means
+
+    def candidates(self):
+        """
+        Returns each player's latest row with the rolling average of the feature in the store's column, keeping
+        players whose average is above 0, in element order.
+        """
+        window_size = min(self.window, len(self.gameweeks))
+        used = np.minimum(self.counts, window_size)
+
+        # The last used values sit at the end of each row
+        columns = np.arange(self.window)
+        mask = columns[None, :] >= (self.window - used)[:, None]
+        values = np.where(mask, self.recent, np.nan)
+        with np.errstate(invalid="ignore"):
+            averages = pd.Series(np.nanmean(values, axis=1) if len(values) else [], index=self.elements, dtype=float)
+
+        current = self.latest.copy()
+        current[self.column] = averages.reindex(current.index).to_numpy()
+        return current[current[self.column] > 0].reset_index(drop=True)
+
+
+def get_feature_store(name, window=3, feature="ict_index"):
+    """
+    Returns a process-wide feature store, loading it from the models folder on first use so it survives restarts.
+
+    :param name: Identifies the season and filtering the store is fed with, e.g. "2024-25-5-60"
+    :param window: Number of rows the rolling average covers
+    :param feature: Column averaged
+    :return: RollingFeatureStore
+    """
+    key = (name, window, feature)
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            file_path = os.path.join(get_models_dir(), f"features-{name}-{feature}-{window}.pkl")
+            store = load_pickle(file_path)
+            if store is None:
+                store = RollingFeatureStore(window, feature)
+            _stores[key] = store
+        return store
+
+
+def save_feature_store(name, store):
+    """
+    Writes a feature store to the models folder, replacing the previous copy atomically.
+    """
+    file_path = os.path.join(get_models_dir(), f"features-{name}-{store.feature}-{store.window}.pkl")
+    with atomic_write(file_path) as file:
+        pickle.dump(store, file)
@@ -1,9 +1,36 @@
 import pandas as pd
-from src.load_data import load_and_filter_data, load_fixture_data
+from src.load_data import load_and_filter_data, load_fixture_data, ensure_merged_gw_file, ensure_fixture_file, previous_season
+from src.model_store import load_or_compute
 
-def scale_pts_by_difficulty():
-	merged_gw = load_and_filter_data(year="2023-24")
-	fixtures = load_fixture_data(year="2023-24")
+def scale_pts_by_difficulty(year="2023-24"):
+	"""
+	Returns the per-position points scale factor for each fixture difficulty, loaded from the model store and only
+	recomputed when the season's merged_gw.csv or fixtures.csv change.
+	"""
+	return load_or_compute(
+		f"difficulty_scale_factors-{year}",
+		[ensure_merged_gw_file(year), ensure_fixture_file(year)],
+		{"year": year},
+		lambda: compute_scale_factors(year)
+	)
+
+def previous_season_scale_factors(year):
+	"""
+	Returns the scale factors fitted on the season before year, which a backtest of year may use without seeing any
+	of that season's results. If that season's data is not available every factor is 1, leaving xPts unscaled.
+	"""
+	try:
+		return scale_pts_by_difficulty(year=previous_season(year))
+	except FileNotFoundError:
+		print(f"No data for {previous_season(year)}, replaying {year} without fixture difficulty scaling")
+		return pd.DataFrame(
+			[(position, difficulty, 1.0) for position in ["GK", "DEF", "MID", "FWD"] for difficulty in range(1, 6)],
+			columns=["position", "difficulty", "scale_factor"]
+		)
+
+def compute_scale_factors(year="2023-24"):
+	merged_gw = load_and_filter_data(year=year, columns=['GW', 'fixture', 'was_home', 'total_points'])
+	fixtures = load_fixture_data(year=year)
 	
 	# Filter out players who have not played any minutes
 	to_include = merged_gw['minutes'] > 0
@@ -16,8 +43,7 @@ def scale_pts_by_difficulty():
 	print(f'Number of rows: {merged_gw.shape[0]}')
 	
 	# Calculate effective difficulty based on home/away status
-	merged_gw['difficulty'] = merged_gw.apply(
-			lambda row: row['team_h_difficulty'] if row['was_home'] == 1 else row['team_a_difficulty'], axis=1)
+	merged_gw['difficulty'] = merged_gw['team_h_difficulty'].where(merged_gw['was_home'] == 1, merged_gw['team_a_difficulty'])
 	
 	# Ensure 'total_points' is numeric
 	merged_gw['total_points'] = pd.to_numeric(merged_gw['total_points'], errors='coerce')
@@ -26,13 +52,13 @@ def scale_pts_by_difficulty():
 	merged_gw = merged_gw.dropna(subset=['total_points'])
 	
 	# Calculate average total points for difficulty
-	avg_points_by_difficulty = merged_gw.groupby(['position', 'difficulty'])['total_points'].mean().reset_index()
+	avg_points_by_difficulty = merged_gw.groupby(['position', 'difficulty'], observed=True)['total_points'].mean().reset_index()
 	
 	# Calculate average total points for position
-	avg_points_by_position = merged_gw.groupby(['position'])['total_points'].mean().reset_index()
+	avg_points_by_position = merged_gw.groupby(['position'], observed=True)['total_points'].mean().reset_index()
 	
 	# Calculate average difficulty for position
-	avg_difficulty_by_position = merged_gw.groupby(['position'])['difficulty'].mean().reset_index()
+	avg_difficulty_by_position = merged_gw.groupby(['position'], observed=True)['difficulty'].mean().reset_index()
 	
 	# Add 'scale_factor' column to avg_points_by_difficulty dataframe
 	avg_points_by_difficulty = avg_points_by_difficulty.merge(
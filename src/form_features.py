@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+FORM_COLUMNS = ["ict_index", "bps", "expected_goals", "expected_assists", "expected_goal_involvements"]
+
+
+def group_layout(elements):
+    """
+    Returns, for rows sorted by element, each row's position within its player's rows and the first row of its player.
+    """
+    rows = np.arange(len(elements))
+    if not len(elements):
+        return rows, rows
+    group_starts = np.flatnonzero(np.r_[True, elements[1:] != elements[:-1]])
+    first_row = group_starts[np.searchsorted(group_starts, rows, side="right") - 1]
+    return rows - first_row, first_row
+
+
+def rolling_means(values, first_row, window):
+    """
+    Computes each player's rolling mean over the last window rows for every column at once, from cumulative sums.
+    NaNs are skipped and one value is enough, as with rolling(window, min_periods=1).
+
+    :param values: 2-D float64 array, rows sorted by element and GW
+    :param first_row: Index of each row's first row for the same player, see group_layout
+    :param window: Number of rows to average over
+    :return: 2-D float64 array of the same shape
+    """
+    present = ~np.isnan(values)
+    sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(np.where(present, values, 0.0), axis=0)])
+    counts = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(present, axis=0)])
+
+    rows = np.arange(len(values))
+    window_start = np.maximum(rows - window + 1, first_row)
+    window_counts = counts[rows + 1] - counts[window_start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, (sums[rows + 1] - sums[window_start]) / window_counts, np.nan)
+
+
+def shift_within_players(values, rank):
+    """
+    Moves each row's values to the player's next row, so a row holds what was known before it. A player's first row
+    gets NaN.
+
+    :param values: 2-D array, rows sorted by element and GW
+    :param rank: Position of each row within its player's rows, see group_layout
+    :return: 2-D float64 array of the same shape
+    """
+    shifted = np.full(values.shape, np.nan)
+    shifted[1:] = values[:-1]
+    shifted[rank == 0] = np.nan
+    return shifted
+
+
+def shifted_rolling_means(values, elements, window=3):
+    """
+    Computes, for every column at once, each player's rolling mean over the previous window rows, the form a row
+    had going into its game week.
+
+    :param values: 2-D float array of feature columns, rows sorted by element and GW
+    :param elements: 1-D array of element keys for the rows
+    :param window: Number of rows to average over
+    :return: 2-D float64 array of the same shape
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rank, first_row = group_layout(np.asarray(elements))
+    return shift_within_players(rolling_means(values, first_row, window), rank)
+
+
+def ewm_means(values, rank, halflife):
+    """
+    Computes each player's exponentially weighted mean for every column at once, matching
+    ewm(halflife=halflife).mean(): older rows decay by half every halflife rows and NaNs add no weight.
+
+    The decay is applied one row position at a time across all players, so the loop runs as many times as the
+    longest player history rather than once per player.
+
+    :param values: 2-D float64 array, rows sorted by element and GW
+    :param rank: Position of each row within its player's rows, see group_layout
+    :param halflife: Number of rows over which a value's weight halves
+    :return: 2-D float64 array of the same shape
+    """
+    decay = 0.5 ** (1.0 / halflife)
+    present = ~np.isnan(values)
+    weighted = np.where(present, values, 0.0)
+    weights = present.astype(np.float64)
+
+    # Rows are contiguous per player, so the previous row of a player's row is the row before it
+    for position in range(1, int(rank.max()) + 1 if len(rank) else 0):
+        rows = np.flatnonzero(rank == position)
+        weighted[rows] += decay * weighted[rows - 1]
+        weights[rows] += decay * weights[rows - 1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weights > 0, weighted / weights, np.nan)
+
+
+def build_form_features(df, columns=None, windows=(3, 5, 8), halflives=(2, 4), dtype=np.float32):
+    """
+    Builds form features for several stats in one pass: the rolling mean over each window and the exponentially
+    weighted mean for each half-life, all from the player's previous game weeks only. A player's first row has no
+    form and is NaN.
+
+    Columns are named "avg_<window>w_<stat>" and "ewm_<halflife>h_<stat>".
+
+    :param df: Game week data with "element" and "GW" columns, e.g. load_and_filter_all_seasons_data, whose element
+        keys are already unique per season
+    :param columns: Stats to build form for, the FORM_COLUMNS present in df by default
+    :param windows: Rolling window sizes in game weeks
+    :param halflives: EWMA half-lives in game weeks
+    :param dtype: dtype of the returned matrix, float32 to keep it compact
+    :return: DataFrame indexed like df, rows sorted by element and GW, so df.join(features) aligns them
+    """
+    if columns is None:
+        columns = [column for column in FORM_COLUMNS if column in df.columns]
+    missing = [column for column in ["element", "GW", *columns] if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns for form features: {missing}")
+
+    df = df.sort_values(by=["element", "GW"], kind="stable")
+    values = df[columns].to_numpy(dtype=np.float64)
+    rank, first_row = group_layout(df["element"].to_numpy())
+
+    names, blocks = [], []
+    for window in windows:
+        names += [f"avg_{window}w_{column}" for column in columns]
+        blocks.append(rolling_means(values, first_row, window))
+    for halflife in halflives:
+        names += [f"ewm_{halflife}h_{column}" for column in columns]
+        blocks.append(ewm_means(values, rank, halflife))
+
+    # Form for a row uses the rows before it, so shift each player's statistics down one row
+    features = np.empty((len(df), len(names)), dtype=dtype)
+    start = 0
+    for block in blocks:
+        features[:, start:start + block.shape[1]] = shift_within_players(block, rank)
+        start += block.shape[1]
+
+    return pd.DataFrame(features, index=df.index, columns=names)
@@ -1,61 +1,182 @@
 import json
 import os
-import shutil
+import pandas as pd
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from src import http_client
+from src.column_store import is_store_fresh, write_column_store
+from src.data_versions import get_version_dir, remove_stale_versions
+from src.single_flight import single_flight
+
+# Fields of bootstrap-static the app reads, with the compact dtypes they are stored in
+BOOTSTRAP_TABLES = {
+    "elements": {
+        "id": "int16",
+        "now_cost": "int16",
+        "chance_of_playing_next_round": "float32",
+        "web_name": "category",
+        "element_type": "int8",
+        "team": "int8"
+    },
+    "events": {
+        "id": "int8",
+        "is_next": "bool",
+        "is_current": "bool",
+        "finished": "bool"
+    },
+    "teams": {
+        "id": "int8",
+        "name": "category",
+        "short_name": "category"
+    }
+}
 
 def download_file_from_github(file_path, local_path):
     """
-    Downloads a file from a GitHub repository and saves it locally.
-    
+    Downloads a file from the vaastav GitHub repository and saves it locally. If the local copy is unchanged
+    upstream it is kept as is.
+
     Args:
-    repo_url (str): The base URL of the GitHub repository.
-    file_path (str): The path to the file within the repository.
-    local_path (str): The local path where the file should be saved.
+        file_path (str): The path to the file within the repository.
+        local_path (str): The local path where the file should be saved.
+
+    Returns:
+        bool: True if the local file is up to date, False if the download failed.
     """
-    repo_url="https://github.com/vaastav/Fantasy-Premier-League"
-    
     # Construct the raw content URL
-    raw_url = f"{repo_url}/raw/master/{file_path}"
+    raw_url = f"{http_client.get_github_raw_url()}/{file_path}"
 
     print(f"Downloading file from {raw_url}...")
-    
-    # Send a GET request to the URL
-    response = requests.get(raw_url)
-    
-    if response.status_code == 200:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        
-        # Write the content to the local file
-        with open(local_path, 'wb') as file:
-            file.write(response.content)
-        print(f"File successfully downloaded to {local_path}")
+
+    try:
+        status = http_client.download(raw_url, local_path)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download file: {str(e)}")
+        return False
+
+    if status == "not_modified":
+        print(f"{local_path} is unchanged upstream")
     else:
-        print(f"Failed to download file. Status code: {response.status_code}")
+        print(f"File successfully downloaded to {local_path}")
+    return True
 
-def fetch_api_data():
-    url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    response = requests.get(url)
+def fetch_api_data(file_path=None):
+    """
+    Fetches bootstrap-static from the FPL API and saves it as JSON.
 
-    if response.status_code == 200:
-        data = response.json()
+    Args:
+        file_path (str, optional): Where to save the response, the current data version's bootstrap-static.json by default.
+
+    Returns:
+        dict: The decoded response, or None if the request failed.
+    """
+    url = f"{http_client.get_fpl_api_url()}/bootstrap-static/"
 
-        # Determine the project root and create the fpl-data directory if it does not exist
-        project_root = os.path.dirname(os.path.dirname(__file__))
-        fpl_data_dir = os.path.join(project_root, "fpl-data")
-        os.makedirs(fpl_data_dir, exist_ok=True)
+    # Save the complete JSON response in the data version folder, creating it if it does not exist
+    file_path = file_path or os.path.join(get_version_dir(), "bootstrap-static.json")
 
-        # Save the complete JSON response in the fpl-data folder with the current date as the filename
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        file_path = os.path.join(fpl_data_dir, f"{current_date}.json")
+    # The response is kept byte for byte for auditing, and the fields the app reads are extracted next to it
+    try:
+        http_client.download(url, file_path)
+        with open(file_path, "r") as json_file:
+            data = json.load(json_file)
+        ensure_bootstrap_tables(file_path, data)
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"Failed to fetch data: {str(e)}")
+        return None
+
+    print(f"API data successfully saved to {file_path}")
+    return data
+
+def get_bootstrap_table_dir(file_path, name):
+    """
+    Returns the column store holding one table extracted from a bootstrap-static file.
+    """
+    return f"{file_path}.{name}.columns"
 
-        with open(file_path, "w") as json_file:
-            json.dump(data, json_file, indent=4)
+def write_bootstrap_tables(file_path, data=None):
+    """
+    Extracts the fields of bootstrap-static the app reads into compact typed column stores next to the JSON file,
+    so the hot path never parses the whole document.
 
-        print(f"API data successfully saved to {file_path}")
-    else:
-        print(f"Failed to fetch data. Status code: {response.status_code}")
+    Args:
+        file_path (str): Path of the bootstrap-static JSON file.
+        data (dict, optional): Its decoded contents, read from file_path by default.
+    """
+    stat = os.stat(file_path)
+    if data is None:
+        with open(file_path, "r") as json_file:
+            data = json.load(json_file)
+
+    for name, schema in BOOTSTRAP_TABLES.items():
+        table = pd.DataFrame(data[name]).reindex(columns=list(schema)).astype(schema)
+        write_column_store(table, get_bootstrap_table_dir(file_path, name), file_path, source_stat=stat)
+
+def ensure_bootstrap_tables(file_path, data=None):
+    """
+    Writes the bootstrap-static tables unless they are already up to date with the JSON file. Concurrent callers
+    for the same file share a single write.
+
+    Args:
+        file_path (str): Path of the bootstrap-static JSON file.
+        data (dict, optional): Its decoded contents, read from file_path if the tables need writing.
+    """
+    def build():
+        if not all(is_store_fresh(get_bootstrap_table_dir(file_path, name), file_path) for name in BOOTSTRAP_TABLES):
+            write_bootstrap_tables(file_path, data)
+
+    single_flight(("bootstrap_tables", file_path), build)
+
+def ensure_file_from_github(file_path, local_path):
+    """
+    Downloads a file from the vaastav GitHub repository unless the local copy already exists. Concurrent callers
+    for the same local path share a single download.
+
+    Args:
+        file_path (str): The path to the file within the repository.
+        local_path (str): The local path where the file should be saved.
+
+    Returns:
+        bool: True if the local file exists, False if the download failed.
+    """
+    def fetch():
+        if os.path.exists(local_path):
+            return True
+        print(f"{local_path} does not exist. Downloading file...")
+        return download_file_from_github(file_path, local_path)
+
+    return single_flight(("github", local_path), fetch)
+
+def ensure_api_data(file_path):
+    """
+    Fetches bootstrap-static unless the file already exists. Concurrent callers for the same path share a single request.
+
+    Args:
+        file_path (str): Where the response is saved.
+
+    Returns:
+        bool: True if the file exists, False if the request failed.
+    """
+    def fetch():
+        return os.path.exists(file_path) or fetch_api_data(file_path) is not None
+
+    return single_flight(("api", file_path), fetch)
+
+def download_files_from_github(downloads, max_workers=8):
+    """
+    Downloads several files from the vaastav GitHub repository in parallel.
+
+    Args:
+        downloads (list): (file_path, local_path) pairs, see download_file_from_github.
+        max_workers (int): Number of downloads in flight at once.
+
+    Returns:
+        dict: Maps each file_path to True if its local copy is up to date, False if the download failed.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {file_path: executor.submit(download_file_from_github, file_path, local_path)
+                   for file_path, local_path in downloads}
+    return {file_path: future.result() for file_path, future in futures.items()}
 
 def fetch_team_gw_data(gw, team_id=1365773):
     """
@@ -69,11 +190,11 @@ def fetch_team_gw_data(gw, team_id=1365773):
         JSON
     """
     # Construct the URL with the provided team_id and game week (gw)
-    url = f"https://fantasy.premierleague.com/api/entry/{team_id}/event/{gw}/picks/"
+    url = f"{http_client.get_fpl_api_url()}/entry/{team_id}/event/{gw}/picks/"
 
     # Perform the GET request to retrieve data
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
         data = response.json()
         return data
@@ -83,28 +204,7 @@ def fetch_team_gw_data(gw, team_id=1365773):
         print(f"An error occurred: {str(e)}")
 
 def cleanup_old_files():
-    # Define the path to the fpl-data directory
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    fpl_data_dir = os.path.join(project_root, "fpl-data")
-
-    # Get today's date in the format used for filenames
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    # List all files and folders in the fpl-data directory
-    items = os.listdir(fpl_data_dir)
-
-    # Iterate through the items
-    for item in items:
-        item_path = os.path.join(fpl_data_dir, item)
-
-        # Check if the item is a directory or an outdated .json file
-        if (os.path.isdir(item_path) and item != today) or (item.endswith(".json") and item != f"{today}.json"):
-            try:
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                    print(f"Deleted old folder: {item_path}")
-                else:
-                    os.remove(item_path)
-                    print(f"Deleted old file: {item}")
-            except Exception as e:
-                print(f"Error deleting file or folder {item}: {str(e)}")
\ No newline at end of file
+    """
+    Removes data versions that are neither current nor being read, keeping fitted models.
+    """
+    remove_stale_versions()
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.atomic_io import atomic_write
+
+# Base URLs can be pointed at a local stand-in server, e.g. benchmarks/http_standin.py, to exercise downloads offline
+DEFAULT_FPL_API_URL = "https://fantasy.premierleague.com/api"
+DEFAULT_GITHUB_RAW_URL = "https://github.com/vaastav/Fantasy-Premier-League/raw/master"
+
+TIMEOUT = (5, 60)  # Seconds to connect, seconds between bytes received
+POOL_SIZE = 16
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_fpl_api_url():
+    return os.environ.get("FPL_API_URL", DEFAULT_FPL_API_URL).rstrip("/")
+
+
+def get_github_raw_url():
+    return os.environ.get("FPL_GITHUB_RAW_URL", DEFAULT_GITHUB_RAW_URL).rstrip("/")
+
+
+def get_session():
+    """
+    Returns the process-wide requests session, so every download reuses pooled keep-alive connections.
+    Connection errors and 429/5xx responses are retried with exponential backoff.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+                respect_retry_after_header=True
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _session = session
+        return _session
+
+
+def get(url, timeout=TIMEOUT, **kwargs):
+    """
+    Sends a GET request through the shared session with a timeout.
+    """
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def _validators_path(local_path):
+    return f"{local_path}.http.json"
+
+
+def _load_validators(local_path):
+    if not os.path.exists(local_path):
+        return {}
+    try:
+        with open(_validators_path(local_path), "r") as validators_file:
+            return json.load(validators_file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def download(url, local_path, timeout=TIMEOUT):
+    """
+    Downloads a URL to a local file. When the file already exists and the server sent an ETag or Last-Modified
+    for it, the request is conditional and a 304 response keeps the local copy untouched.
+
+    The body is streamed to a temporary file and moved into place, so readers never see a partial file.
+
+    :param url: URL to fetch
+    :param local_path: Where to save the response body
+    :param timeout: Requests timeout
+    :return: "downloaded" or "not_modified"
+    :raises requests.RequestException: If the request fails after retries, returns an error status, or answers 304
+        when no validators were sent; the local file is left as it was
+    """
+    validators = _load_validators(local_path)
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    with get(url, timeout=timeout, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            # Only a conditional request can be answered with "not modified", otherwise there is no body to keep
+            if headers:
+                return "not_modified"
+            raise requests.HTTPError(f"304 Not Modified for an unconditional request to {url}", response=response)
+        response.raise_for_status()
+
+        with atomic_write(local_path) as file:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                file.write(chunk)
+
+        validators = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+
+    # Replaced rather than rewritten, since the file may be hard-linked into another data version
+    with atomic_write(_validators_path(local_path), "w") as validators_file:
+        json.dump(validators, validators_file)
+
+    return "downloaded"
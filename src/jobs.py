@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.main import get_best_squad, get_gameweek, recommendation_to_dict
+
+MAX_WORKERS = 2
+JOB_TTL = 600  # Seconds a finished job's result can still be fetched
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="squad-job")
+_jobs = {}
+_in_flight = {}
+_lock = threading.Lock()
+
+
+class Job:
+    """
+    One squad recommendation request and its outcome.
+
+    :param job_id: Identifier returned to the client
+    :param key: (team_id, gw, free_transfers, wildcard) the job is coalesced on
+    """
+    def __init__(self, job_id, key):
+        self.job_id = job_id
+        self.key = key
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        team_id, gw, free_transfers, wildcard = self.key
+        job = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "team_id": team_id,
+            "gw": gw,
+            "free_transfers": free_transfers,
+            "wildcard": wildcard
+        }
+        if self.result is not None:
+            job["result"] = self.result
+        if self.error is not None:
+            job["error"] = self.error
+        return job
+
+
+def _run(job):
+    team_id, _, free_transfers, wildcard = job.key
+    job.status = "running"
+    try:
+        job.result = recommendation_to_dict(*get_best_squad(team_id, free_transfers, wildcard))
+        job.status = "done"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+        with _lock:
+            _in_flight.pop(job.key, None)
+        job.done.set()
+
+
+def _evict_expired(now):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job.finished_at is not None and now - job.finished_at > JOB_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def submit_squad_job(team_id, free_transfers, wildcard=False):
+    """
+    Queues a squad recommendation on the worker pool. A request identical to one that is still queued or running
+    gets that job back instead of a new one.
+
+    :param team_id: FPL team ID, ignored with a wildcard
+    :param free_transfers: Available free transfers
+    :param wildcard: Whether to pick a fresh squad
+    :return: The Job
+    """
+    if wildcard:
+        team_id, free_transfers = None, 0
+    key = (team_id, get_gameweek(), free_transfers, wildcard)
+
+    with _lock:
+        _evict_expired(time.time())
+        job = _in_flight.get(key)
+        if job is not None:
+            return job
+
+        job = Job(uuid.uuid4().hex, key)
+        _jobs[job.job_id] = job
+        _in_flight[key] = job
+
+    _executor.submit(_run, job)
+    return job
+
+
+def get_job(job_id, wait=0):
+    """
+    Returns a job by ID, optionally waiting up to wait seconds for it to finish.
+
+    :param job_id: Identifier returned by submit_squad_job
+    :param wait: Seconds to wait for the job to finish before returning it as is
+    :return: The Job, or None if it is unknown or has expired
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is not None and wait > 0:
+        job.done.wait(wait)
+    return job
@@ -1,48 +1,169 @@
 import json
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime
-from src.get_data import fetch_team_gw_data, download_file_from_github, fetch_api_data, cleanup_old_files
+import threading
+from src.get_data import ensure_file_from_github, ensure_api_data, ensure_bootstrap_tables, get_bootstrap_table_dir, cleanup_old_files, BOOTSTRAP_TABLES
+from src.data_versions import get_version_dir, pin_version
+from src.column_store import ensure_column_store, load_csv_columns, read_column_store
+from src.picks_cache import get_team_gw_data
+
+# Compact dtypes shared by every loader of game week history. Integer types are only applied when the values fit.
+FPL_SCHEMA = {
+    **{column: "category" for column in ["position", "team", "team_x", "name", "season_x", "kickoff_time"]},
+    **{column: "int8" for column in ["GW", "round"]},
+    **{column: "int16" for column in [
+        "minutes", "total_points", "fixture", "value", "bps", "bonus", "goals_scored", "assists", "clean_sheets",
+        "goals_conceded", "own_goals", "penalties_missed", "penalties_saved", "red_cards", "yellow_cards", "saves",
+        "opponent_team", "team_a_score", "team_h_score", "starts"
+    ]},
+    **{column: "int32" for column in ["element", "selected", "transfers_in", "transfers_out", "transfers_balance"]},
+    **{column: "float32" for column in [
+        "ict_index", "influence", "creativity", "threat", "xP", "expected_goals", "expected_assists",
+        "expected_goal_involvements", "expected_goals_conceded"
+    ]}
+}
+
+def normalise_positions(positions):
+    """
+    Converts "GKP" to "GK", keeping categorical columns categorical without decoding every row.
 
-def load_and_filter_data(year="2023-24", min_gw=10, min_minutes=60):
+    :param positions: Series of position labels
+    :return: Series with "GKP" replaced by "GK"
     """
-    Loads the CSV file, filters out players who played fewer than the specified minutes in the specified number of game weeks,
-    and returns the filtered DataFrame with "GKP" converted to "GK".
+    if not isinstance(positions.dtype, pd.CategoricalDtype):
+        return positions.replace("GKP", "GK")
+
+    renamed = ["GK" if category == "GKP" else category for category in positions.cat.categories]
+    categories = list(dict.fromkeys(renamed))
+    # Map old codes to new ones; the trailing -1 keeps missing values missing
+    remap = np.array([categories.index(category) for category in renamed] + [-1])
+    codes = remap[positions.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=positions.index, name=positions.name)
+
+def get_data_file_path(remote_path, version=None):
+    """
+    Returns the local path of a file from the vaastav repository inside a data version's folder.
+
+    :param remote_path: The path to the file within the repository
+    :param version: Data version, the current one by default
+    :return: Absolute local file path
+    """
+    return os.path.join(get_version_dir(version), remote_path)
+
+def get_bootstrap_path(version=None):
+    """
+    Returns the local path of a data version's bootstrap-static.json, the current version by default.
+    """
+    return os.path.join(get_version_dir(version), "bootstrap-static.json")
+
+def ensure_merged_gw_file(year="2023-24", version=None):
+    """
+    Returns the local path of a season's merged_gw.csv, downloading it first if the data version's copy is missing.
 
     :param year: Premier League Season
-    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
-    :param min_minutes: The minimum number of minutes a player must have played in a game week
-    :return: Filtered DataFrame
+    :param version: Data version, the current one by default
+    :return: Local file path
     """
-    # Determine the correct file path
-    project_root = os.path.dirname(os.path.dirname(__file__))  # Navigate to the project root
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    file_path = os.path.join(project_root, "fpl-data", current_date, "data", year, "gws", "merged_gw.csv")
     remote_path = f"data/{year}/gws/merged_gw.csv"
+    file_path = get_data_file_path(remote_path, version)
 
-    # Check if the file exists, if not, download the repository
+    # Download the file if it is missing; concurrent callers wait for the same download
     if not os.path.exists(file_path):
-        print(f"{file_path} does not exist. Downloading the file....")
-        download_file_from_github(remote_path, file_path)
-        load_latest_data()
+        if ensure_file_from_github(remote_path, file_path):
+            ensure_column_store(file_path)
+        ensure_api_data(get_bootstrap_path(version))
         cleanup_old_files()
-        
 
-    # Load the CSV file
-    df = pd.read_csv(file_path)
+    return file_path
+
+def ensure_fixture_file(year="2024-25", version=None):
+    """
+    Returns the local path of a season's fixtures.csv, downloading it first if the data version's copy is missing.
+
+    :param year: Premier League Season
+    :param version: Data version, the current one by default
+    :return: Local file path
+    """
+    remote_path = f"data/{year}/fixtures.csv"
+    file_path = get_data_file_path(remote_path, version)
+
+    # Download the file if it is missing; concurrent callers wait for the same download
+    if not os.path.exists(file_path) and ensure_file_from_github(remote_path, file_path):
+        ensure_column_store(file_path)
+
+    return file_path
+
+def load_and_filter_data(year="2023-24", min_gw=10, min_minutes=60, columns=None):
+    """
+    Loads the CSV file, filters out players who played fewer than the specified minutes in the specified number of game weeks,
+    and returns the filtered DataFrame with "GKP" converted to "GK".
+
+    :param year: Premier League Season
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :param columns: Columns to load, all columns by default; the columns needed for filtering are always loaded
+    :return: Filtered DataFrame
+    """
+    # Load the CSV file through its columnar copy, keeping the data version from being removed meanwhile
+    if columns is not None:
+        columns = list(dict.fromkeys([*columns, "element", "GW", "minutes", "position"]))
+    with pin_version() as version:
+        file_path = ensure_merged_gw_file(year, version)
+        df = load_csv_columns(file_path, columns, dtypes=FPL_SCHEMA)
 
     # Convert "GKP" to "GK" in the position column
-    df["position"] = df["position"].replace("GKP", "GK")
+    df["position"] = normalise_positions(df["position"])
 
-    # Calculate the number of game weeks each player played at least the specified minutes
-    player_gw_count = df[df["minutes"] >= min_minutes].groupby("element")["GW"].count()
-    eligible_players = player_gw_count[player_gw_count >= min_gw].index
+    df = filter_eligible_players(df, min_gw=min_gw, min_minutes=min_minutes)
 
     # Print the number of eligible players
-    print(f"Number of filtered players for {year} who (played at least {min_minutes} minutes in at least {min_gw} game weeks): {len(eligible_players)}")
+    print(f"Number of filtered players for {year} who (played at least {min_minutes} minutes in at least {min_gw} game weeks): {df['element'].nunique()}")
+
+    return df
+
+def filter_eligible_players(df, min_gw=10, min_minutes=60):
+    """
+    Keeps only players who played at least the specified minutes in at least the specified number of game weeks.
+
+    :param df: Game week data with "element", "GW" and "minutes" columns
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :return: Filtered DataFrame
+    """
+    # Count, in a single grouped pass, the game weeks each player played at least the specified minutes
+    played = (df["minutes"] >= min_minutes).groupby(df["element"].to_numpy()).transform("sum")
 
     # Filter and return the DataFrame with only eligible players
-    return df[df["element"].isin(eligible_players)]
+    return df[played.to_numpy() >= min_gw]
+
+def load_all_seasons_data(columns=None):
+    """
+    Loads the CSV file containing data from multiple seasons, with "GKP" converted to "GK" and no players filtered out.
+
+    :param columns: Columns to load, all columns by default
+    :return: DataFrame of every season's game week rows, with the season in the "season_x" column
+    """
+    remote_path = "data/cleaned_merged_seasons.csv"
+
+    # Load the CSV file with dtype specified and low_memory=False to avoid DtypeWarning
+    dtype_dict = {"column_name": str}  # Replace "column_name" with the name of the column(s) causing issues
+
+    with pin_version() as version:
+        file_path = get_data_file_path(remote_path, version)
+
+        # Download the file if it is missing; concurrent callers wait for the same download
+        if not os.path.exists(file_path):
+            ensure_file_from_github(remote_path, file_path)
+
+        # Load the CSV file through its columnar copy
+        df = load_csv_columns(file_path, columns, dtypes=FPL_SCHEMA, dtype=dtype_dict, low_memory=False)
+
+    # Convert "GKP" to "GK" in the position column
+    if "position" in df.columns:
+        df["position"] = normalise_positions(df["position"])
+
+    return df
 
 def load_and_filter_all_seasons_data(min_gw=10, min_minutes=60):
     """
@@ -53,60 +174,122 @@ def load_and_filter_all_seasons_data(min_gw=10, min_minutes=60):
     :param min_minutes: The minimum number of minutes a player must have played in a game week
     :return: Filtered DataFrame with unique element_id per season
     """
-    project_root = os.path.dirname(os.path.dirname(__file__))  # Navigate to the project root
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    file_path = os.path.join(project_root, "fpl-data", current_date, "data", "cleaned_merged_seasons.csv")
-    remote_path = "data/cleaned_merged_seasons.csv"
+    df = load_all_seasons_data()
 
-    # Check if the file exists, if not, download the repository
-    if not os.path.exists(file_path):
-        print(f"{file_path} does not exist. Downloading file...")
-        download_file_from_github(remote_path, file_path)
-    # Load the CSV file with dtype specified and low_memory=False to avoid DtypeWarning
-    dtype_dict = {"column_name": str}  # Replace "column_name" with the name of the column(s) causing issues
-    df = pd.read_csv(file_path, dtype=dtype_dict, low_memory=False)
+    # Update element_id to be unique per season as an integer key, e.g. element 123 in 2023-24 becomes 20230123
+    df["element"] = season_element_key(df["season_x"], df["element"])
 
-    # Convert "GKP" to "GK" in the position column
-    df["position"] = df["position"].replace("GKP", "GK")
+    return filter_eligible_players(df, min_gw=min_gw, min_minutes=min_minutes)
 
-    # Update element_id to be unique per season by appending the season
-    df["element"] = df["element"].astype(str) + "-" + df["season_x"]
+def season_element_key(seasons, elements):
+    """
+    Combines seasons such as "2023-24" and element ids into integer keys of the form <season start year> * 10000 + element.
 
-    # Calculate the number of game weeks each player played at least the specified minutes
-    player_gw_count = df[df["minutes"] >= min_minutes].groupby("element")["GW"].count()
-    eligible_players = player_gw_count[player_gw_count >= min_gw].index
+    :param seasons: Series of season labels, categorical or plain strings
+    :param elements: Series of element ids
+    :return: int32 NumPy array of keys
+    """
+    seasons = seasons.astype("category")
+    start_years = seasons.cat.categories.str[:4].astype(np.int32).to_numpy()
+    return (start_years[seasons.cat.codes.to_numpy()] * 10000 + elements.to_numpy()).astype(np.int32)
 
-    # Filter and return the DataFrame with only eligible players
-    return df[df["element"].isin(eligible_players)]
+def previous_season(year):
+    """
+    Returns the label of the season before year, e.g. "2022-23" for "2023-24".
+    """
+    start_year = int(year[:4]) - 1
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
 
-def load_latest_data():
+def load_latest_data(version=None):
     """
-    Loads the latest player data from the JSON file in the fpl-data directory.
+    Loads the latest player data from the bootstrap-static JSON file of a data version.
 
+    :param version: Data version, the current one by default
     :return: List of player data from the JSON file
     """
-    # Determine the project root and build the path to the fpl-data folder
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    fpl_data_dir = os.path.join(project_root, "fpl-data")
+    with pin_version(version) as version:
+        file_path = get_bootstrap_path(version)
 
-    # Determine the file name based on the current date
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    file_path = os.path.join(fpl_data_dir, f"{current_date}.json")
+        if not os.path.exists(file_path) and not ensure_api_data(file_path):
+            raise FileNotFoundError("Failed to fetch latest data.")
 
-    if not os.path.exists(file_path):
-        fetch_api_data()
+        # Load the JSON data from the file
+        try:
+            with open(file_path, "r") as json_file:
+                data = json.load(json_file)
+                return data
+        except Exception as e:
+            raise FileNotFoundError(f"Failed to load data from {file_path}: {str(e)}")
 
-        # Double-check if the file was saved correctly
-        if not os.path.exists(file_path):
+def load_bootstrap_table(file_path, name, columns=None):
+    """
+    Loads a compact table extracted from a bootstrap-static file, writing it first if it is missing or stale.
+
+    :param file_path: Path of the bootstrap-static JSON file
+    :param name: "elements", "events" or "teams", see get_data.BOOTSTRAP_TABLES
+    :param columns: Columns to load, all stored columns by default
+    :return: DataFrame
+    """
+    ensure_bootstrap_tables(file_path)
+    return read_column_store(get_bootstrap_table_dir(file_path, name), columns, dtypes=BOOTSTRAP_TABLES[name])
+
+class BootstrapSnapshot:
+    """
+    A view of one bootstrap-static file, shared by every caller until the underlying file changes. Elements, events
+    and teams come from the compact tables written next to the file, as DataFrames with one row per entry rather than
+    the document's lists of dicts; the full document is only parsed if data is read.
+
+    :param file_path: Path of the bootstrap-static JSON file
+    :param version: An opaque tag identifying the file this snapshot was loaded from
+    """
+    def __init__(self, file_path, version):
+        self.file_path = file_path
+        self.version = version
+        self._data = None
+        self.elements = load_bootstrap_table(file_path, "elements")
+        self.events = load_bootstrap_table(file_path, "events")
+        self.teams = load_bootstrap_table(file_path, "teams")
+
+        # Find current gameweek, defaulting to GW1 if no event is flagged as next
+        next_events = self.events.loc[self.events["is_next"], "id"]
+        self.gameweek = int(next_events.iloc[0]) if len(next_events) else 1
+        self.finished_gameweeks = set(self.events.loc[self.events["finished"], "id"].tolist())
+
+    @property
+    def data(self):
+        """The decoded bootstrap-static JSON document, parsed on first access"""
+        if self._data is None:
+            with open(self.file_path, "r") as json_file:
+                self._data = json.load(json_file)
+        return self._data
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_bootstrap_snapshot():
+    """
+    Returns the process-wide bootstrap snapshot, reloaded only when a new data version is published, the date
+    rolls over, or the file is replaced on disk.
+
+    :return: BootstrapSnapshot for the current data version
+    """
+    global _snapshot
+
+    with _snapshot_lock, pin_version() as version:
+        file_path = get_bootstrap_path(version)
+        if _snapshot is not None and os.path.exists(file_path):
+            stat = os.stat(file_path)
+            if _snapshot.version == (file_path, stat.st_mtime_ns, stat.st_size):
+                return _snapshot
+
+        if not os.path.exists(file_path) and not ensure_api_data(file_path):
             raise FileNotFoundError("Failed to fetch latest data.")
-                                    
-    # Load the JSON data from the file
-    try:
-        with open(file_path, "r") as json_file:
-            data = json.load(json_file)
-            return data
-    except Exception as e:
-        raise FileNotFoundError(f"Failed to load data from {file_path}: {str(e)}")
+        stat = os.stat(file_path)
+        _snapshot = BootstrapSnapshot(file_path, (file_path, stat.st_mtime_ns, stat.st_size))
+        return _snapshot
+
 
 def load_team_data(gw, team_id=1365773):
     """
@@ -119,7 +302,10 @@ def load_team_data(gw, team_id=1365773):
     Returns:
         pd.DataFrame: A DataFrame containing the FPL data, including the latest player information.
     """
-    data = fetch_team_gw_data(gw, team_id)
+    snapshot = get_bootstrap_snapshot()
+
+    # Picks for a finished game week never change, so they are served from the picks cache
+    data = get_team_gw_data(gw, team_id, finished=gw in snapshot.finished_gameweeks)
     # Convert the JSON data to a Pandas DataFrame
     picks = data.get("picks", []) if data else []
     
@@ -131,15 +317,12 @@ def load_team_data(gw, team_id=1365773):
     df = pd.DataFrame(picks)
 
     # Load the latest data
-    latest_data = load_latest_data()["elements"]
+    latest_data = snapshot.elements
 
     # Merge the latest data into the picks DataFrame
     if latest_data is not None:
-        # Create a DataFrame from the latest_data
-        latest_df = pd.DataFrame(latest_data)
-
-        # Rename specific columns
-        latest_df.rename(columns={"id": "element"}, inplace=True)
+        # Rename specific columns on a copy so the shared snapshot is left untouched
+        latest_df = latest_data.rename(columns={"id": "element"})
 
         # Map to convert element_type to position
         position_map = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
@@ -190,20 +373,9 @@ def create_current_team_df(picks_df, player_data):
     return updated_picks_df
 
 def load_fixture_data(year="2024-25"):
-    # Current date in yyyy-mm-dd format
-    current_date = pd.Timestamp.now().strftime("%Y-%m-%d")
-
-    # Load merged_gw and fixtures data
-    file_path = f'fpl-data/{current_date}/data/{year}/fixtures.csv'
-    remote_path = f"data/{year}/fixtures.csv"
-
-    # Check if the file exists, if not, download the repository
-    if not os.path.exists(file_path):
-        print(f"{file_path} does not exist. Downloading file...")
-        download_file_from_github(remote_path, file_path)
-    
-    
-    fixtures = pd.read_csv(file_path)
+    with pin_version() as version:
+        file_path = ensure_fixture_file(year, version)
+        fixtures = load_csv_columns(file_path)
     fixtures['event'] = fixtures['event'].astype(int)
 
     # Replace 'event' with 'gw' in fixtures DataFrame
@@ -1,12 +1,15 @@
-from src.build_squad import pick_best_squad, get_eligible_players_for_gw
-from src.load_data import load_and_filter_data, load_team_data, load_latest_data
+from src.build_squad import pick_best_squad
+from src.candidate_cache import get_cached_eligible_players
+from src.load_data import load_team_data, get_bootstrap_snapshot
+from src.refresh import REFRESH_SEASONS
+from src.x_pts import get_season_stats
 
-def get_best_squad(team_id, free_transfers, wildcard=False):
-    game_week = get_gameweek()
+def get_best_squad(team_id, free_transfers, wildcard=False, horizon=1, fresh=False):
+    snapshot = get_bootstrap_snapshot()
+    game_week = snapshot.gameweek
     try:
-        latest_data = load_latest_data()["elements"]
-        fpl_data = load_and_filter_data(year="2024-25", min_minutes=60, min_gw=5)
-        eligible_players = get_eligible_players_for_gw(gw=game_week, merged_gw_df=fpl_data, latest_data=latest_data)
+        # Results cached per data version need the current version's table, not a stale one served during a rebuild
+        eligible_players = get_cached_eligible_players(season="2024-25", gw=game_week, min_gw=5, min_minutes=60, fresh=fresh)
 
         value = 1000
         
@@ -15,7 +18,7 @@ def get_best_squad(team_id, free_transfers, wildcard=False):
         else:
             current_team = None
 
-        squad, best_11, captain, transfers = pick_best_squad(player_data=eligible_players, prev_squad=current_team, free_transfers=free_transfers, transfer_threshold=4, budget=value)
+        squad, best_11, captain, transfers = pick_best_squad(player_data=eligible_players, prev_squad=current_team, free_transfers=free_transfers, transfer_threshold=4, budget=value, horizon=horizon, gw=game_week)
 
         predicted_points = best_11["xPts"].sum() + captain["xPts"]
 
@@ -25,25 +28,44 @@ def get_best_squad(team_id, free_transfers, wildcard=False):
         raise Exception(f"An error occurred: {str(e)}")
 
 def get_gameweek():
-    # Fetch events data from FPL API
-    data = load_latest_data()
-    events = data['events']
+    # The snapshot resolves the next gameweek once per data version
+    return get_bootstrap_snapshot().gameweek
 
-    # Find current gameweek
-    gw = 1  # Default to GW1 if no other match found
-
-    for event in events:
-        if event['is_next']:
-            gw = event['id']
-            break
-
-    return gw
-
-def get_best_possible_squad():
+def get_best_possible_squad(fresh=False):
     """Get the best possible squad without any team constraints"""
     try:
-        squad, best_11, captain, predicted_points, transfers = get_best_squad(None, 0, True)
+        squad, best_11, captain, predicted_points, transfers = get_best_squad(None, 0, True, fresh=fresh)
         
         return squad, best_11, captain, predicted_points, transfers
     except Exception as e:
-        return None, str(e)
\ No newline at end of file
+        return None, str(e)
+
+def warm_up():
+    """
+    Loads today's bootstrap data, folds new game weeks of the refreshed seasons into their stored xPts statistics
+    and builds the eligible-player table for the next game week, so the first request does not pay for downloads
+    and model fitting. The background refresher calls this after every refresh.
+    """
+    for season in REFRESH_SEASONS:
+        get_season_stats(season)
+    get_cached_eligible_players(season="2024-25", gw=get_gameweek(), min_gw=5, min_minutes=60, fresh=True)
+
+def player_summary(player):
+    """Returns the JSON-ready fields of one player row"""
+    return {
+        "element": int(player["element"]),
+        "web_name": player.get("web_name"),
+        "position": player.get("position"),
+        "xPts": round(float(player["xPts"]), 2)
+    }
+
+def recommendation_to_dict(squad, best_11, captain, predicted_points, transfers):
+    """Converts the output of get_best_squad into plain JSON-ready types"""
+    return {
+        "predicted_points": round(float(predicted_points), 2),
+        "captain": player_summary(captain),
+        "transfers": [{"out": player_summary(player_out), "in": player_summary(player_in)}
+                      for player_out, player_in in transfers],
+        "best_11": [player_summary(player) for _, player in best_11.iterrows()],
+        "squad": [player_summary(player) for _, player in squad.iterrows()]
+    }
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from src.build_squad import pick_best_squad
+from src.candidate_cache import get_cached_eligible_players
+from src.load_data import load_team_data, get_bootstrap_snapshot
+from src.main import recommendation_to_dict
+from src.picks_cache import log_picks_cache_stats
+
+# Eligible-player table shared by every solve in a worker process, set once by _init_worker
+_eligible_players = None
+
+
+def _init_worker(eligible_players):
+    global _eligible_players
+    _eligible_players = eligible_players
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def _start_workers(solver, workers):
+    """
+    Makes the process pool start all of its workers now. The pool otherwise forks them on the first submits, by
+    which time the picks fetcher's threads are running, and a child forked while one of them holds a lock
+    (logging, the SSL stack, the allocator) can deadlock.
+    """
+    wait([solver.submit(_worker_ready) for _ in range(workers)])
+
+
+def _solve_team(team_id, current_team, value, free_transfers, transfer_threshold, horizon, gw):
+    """
+    Solves one team's transfers against the shared eligible-player table and returns a JSON-ready record.
+    """
+    start = time.perf_counter()
+
+    # The solvers print progress for every call, which is noise when thousands of teams run in parallel
+    with contextlib.redirect_stdout(io.StringIO()):
+        squad, best_11, captain, transfers = pick_best_squad(
+            player_data=_eligible_players.copy(deep=False),
+            prev_squad=current_team,
+            free_transfers=free_transfers,
+            transfer_threshold=transfer_threshold,
+            budget=value,
+            horizon=horizon,
+            gw=gw
+        )
+
+    predicted_points = best_11["xPts"].sum() + captain["xPts"]
+    return {
+        "team_id": team_id,
+        "gw": gw,
+        **recommendation_to_dict(squad, best_11, captain, predicted_points, transfers),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def recommend_for_teams(team_ids, output_path, free_transfers=1, transfer_threshold=4, horizon=1,
+                        fetch_workers=16, max_workers=None):
+    """
+    Recommends transfers for many teams in one run, e.g. a whole mini-league.
+
+    The eligible-player table is built once. Picks are fetched on a bounded thread pool and each team is handed to a
+    process pool as soon as its picks arrive. Results are appended to a JSONL file as they finish, one line per team;
+    teams that fail get a line with an "error" field instead.
+
+    :param team_ids: FPL team IDs
+    :param output_path: JSONL file to write
+    :param free_transfers: Free transfers assumed for every team
+    :param transfer_threshold: Points a transfer must gain to be made
+    :param horizon: Game weeks to plan over, see pick_best_squad
+    :param fetch_workers: Number of picks requests in flight at once
+    :param max_workers: Number of solver processes, one per CPU by default
+    :return: Dictionary with the number of teams solved and failed, the elapsed seconds and teams per minute
+    """
+    start = time.perf_counter()
+    gw = get_bootstrap_snapshot().gameweek
+    eligible_players = get_cached_eligible_players(season="2024-25", gw=gw, min_gw=5, min_minutes=60)
+    print(f"Eligible players for GW{gw} ready in {time.perf_counter() - start:.1f} s")
+
+    start_methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+
+    # The solver processes are forked before the fetcher starts any thread
+    workers = max_workers or os.cpu_count() or 1
+    solved, failed = 0, 0
+    with open(output_path, "w") as output_file, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                initializer=_init_worker, initargs=(eligible_players,)) as solver:
+        _start_workers(solver, workers)
+        with ThreadPoolExecutor(max_workers=fetch_workers) as fetcher:
+
+            def write(record):
+                output_file.write(json.dumps(record) + "\n")
+                output_file.flush()
+
+            fetches = {fetcher.submit(load_team_data, gw - 1, team_id): team_id for team_id in team_ids}
+            solves = {}
+            pending = set(fetches)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        # Picks arrived, hand the team to a solver process
+                        team_id = fetches[future]
+                        try:
+                            current_team, value = future.result()
+                        except Exception as e:
+                            failed += 1
+                            write({"team_id": team_id, "error": f"Failed to load picks: {str(e)}"})
+                            continue
+                        solve = solver.submit(_solve_team, team_id, current_team, value, free_transfers,
+                                              transfer_threshold, horizon, gw)
+                        solves[solve] = team_id
+                        pending.add(solve)
+                    else:
+                        team_id = solves[future]
+                        try:
+                            write(future.result())
+                            solved += 1
+                        except Exception as e:
+                            failed += 1
+                            write({"team_id": team_id, "error": str(e)})
+
+    elapsed = time.perf_counter() - start
+    teams_per_minute = (solved + failed) / elapsed * 60 if elapsed else 0.0
+    print(f"{solved} teams solved, {failed} failed in {elapsed:.1f} s ({teams_per_minute:.0f} teams per minute)")
+    log_picks_cache_stats()
+    return {"solved": solved, "failed": failed, "seconds": round(elapsed, 2), "teams_per_minute": round(teams_per_minute, 1)}
+
+
+def read_team_ids(file_path):
+    """
+    Reads team IDs from a text file, one per line or separated by commas or spaces.
+    """
+    with open(file_path, "r") as ids_file:
+        return [int(token) for token in ids_file.read().replace(",", " ").split()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend transfers for many FPL teams in one run.")
+    parser.add_argument("team_ids", nargs="*", type=int, help="FPL team IDs")
+    parser.add_argument("--ids-file", help="File with team IDs, one per line")
+    parser.add_argument("--free-transfers", type=int, default=1)
+    parser.add_argument("--horizon", type=int, default=1)
+    parser.add_argument("--fetch-workers", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="recommendations.jsonl")
+    args = parser.parse_args()
+
+    team_ids = args.team_ids + (read_team_ids(args.ids_file) if args.ids_file else [])
+    if not team_ids:
+        parser.error("no team IDs given")
+
+    recommend_for_teams(team_ids, args.output, free_transfers=args.free_transfers, horizon=args.horizon,
+                        fetch_workers=args.fetch_workers, max_workers=args.workers)
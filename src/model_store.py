@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from src.atomic_io import atomic_write, load_pickle
+from src.data_versions import get_fpl_data_dir
+
+_digests = {}
+_artifacts = {}  # name -> (key, artifact), only the latest artifact of each name is kept
+_lock = threading.Lock()
+
+
+def get_models_dir():
+    """
+    Returns the directory holding fitted model artifacts. It lives outside the dated data folders so it survives
+    the daily cleanup, and follows FPL_DATA_DIR like the data itself.
+    """
+    return os.path.join(get_fpl_data_dir(), "models")
+
+
+def file_digest(file_path):
+    """
+    Returns the SHA-256 digest of a file's contents, hashing each (path, mtime, size) combination only once per process.
+
+    :param file_path: Path of the file to hash
+    :return: Hex digest string
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        if key in _digests:
+            return _digests[key]
+
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _lock:
+        _digests[key] = digest
+    return digest
+
+
+def load_or_compute(name, input_paths, params, compute):
+    """
+    Loads a model artifact keyed by the content of its input files and its parameters, computing and storing it
+    only when no matching artifact exists. Only the latest artifact of each name is kept, in memory and on disk, so
+    artifacts that must coexist, such as one per season, need names of their own.
+
+    :param name: Artifact name, used as the file name prefix
+    :param input_paths: Paths of the files the artifact is derived from
+    :param params: JSON-serialisable dictionary of parameters the artifact depends on
+    :param compute: Zero-argument callable producing the artifact
+    :return: The stored or freshly computed artifact
+    """
+    key_source = json.dumps({
+        "inputs": [file_digest(path) for path in input_paths],
+        "params": params
+    }, sort_keys=True)
+    key = hashlib.sha256(key_source.encode()).hexdigest()[:16]
+
+    with _lock:
+        if name in _artifacts and _artifacts[name][0] == key:
+            return _artifacts[name][1]
+
+    models_dir = get_models_dir()
+    file_path = os.path.join(models_dir, f"{name}-{key}.pkl")
+
+    artifact = load_pickle(file_path)
+    if artifact is None:
+        artifact = compute()
+        with atomic_write(file_path) as file:
+            pickle.dump(artifact, file)
+        print(f"Model artifact saved to {file_path}")
+        remove_older_artifacts(name, key)
+
+    with _lock:
+        _artifacts[name] = (key, artifact)
+    return artifact
+
+
+def remove_older_artifacts(name, key):
+    """
+    Deletes the stored artifacts of a name other than the one with the given key, which its inputs have replaced.
+
+    :param name: Artifact name
+    :param key: Key of the artifact to keep
+    """
+    models_dir = get_models_dir()
+    pattern = re.compile(re.escape(name) + r"-[0-9a-f]{16}\.pkl")
+    for file_name in os.listdir(models_dir):
+        if pattern.fullmatch(file_name) and file_name != f"{name}-{key}.pkl":
+            try:
+                os.remove(os.path.join(models_dir, file_name))
+            except FileNotFoundError:
+                pass
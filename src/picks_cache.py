@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.atomic_io import atomic_write
+from src.data_versions import get_fpl_data_dir
+from src.get_data import fetch_team_gw_data
+from src.single_flight import single_flight
+
+MAX_ENTRIES = 2048
+LIVE_TTL = 300  # Seconds picks for an unfinished game week are reused
+
+_entries = OrderedDict()
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def get_picks_dir():
+    """
+    Returns the folder holding picks for finished game weeks. It sits outside the data versions so it survives
+    refreshes and restarts.
+    """
+    return os.path.join(get_fpl_data_dir(), "cache", "picks")
+
+
+def _disk_path(gw, team_id):
+    return os.path.join(get_picks_dir(), f"{team_id}-{gw}.json")
+
+
+def _remember(key, data, expires_at):
+    with _lock:
+        _entries[key] = (data, expires_at)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def _load_from_disk(gw, team_id):
+    try:
+        with open(_disk_path(gw, team_id), "r") as picks_file:
+            return json.load(picks_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_to_disk(gw, team_id, data):
+    with atomic_write(_disk_path(gw, team_id), "w") as picks_file:
+        json.dump(data, picks_file)
+
+
+def get_team_gw_data(gw, team_id, finished):
+    """
+    Returns a team's picks for a game week, calling the FPL API only when they are not cached.
+
+    Picks for finished game weeks never change, so they are kept until evicted from the in-memory LRU and are also
+    written to disk. Picks for the game week in progress are reused for LIVE_TTL seconds.
+
+    :param gw: The game week
+    :param team_id: The team ID
+    :param finished: Whether the game week has finished
+    :return: The decoded picks response, or None if it could not be fetched. Callers must not modify it.
+    """
+    key = (team_id, gw)
+    now = time.monotonic()
+
+    with _lock:
+        cached = _entries.get(key)
+        if cached is not None and (cached[1] is None or cached[1] > now):
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return cached[0]
+
+    if finished:
+        data = _load_from_disk(gw, team_id)
+        if data is not None:
+            _remember(key, data, None)
+            with _lock:
+                _stats["disk_hits"] += 1
+            return data
+
+    with _lock:
+        _stats["misses"] += 1
+
+    # A burst of identical requests shares one upstream call
+    data = single_flight(("picks", team_id, gw), fetch_team_gw_data, gw, team_id)
+    if data is None:
+        return None
+
+    if finished:
+        _remember(key, data, None)
+        try:
+            _save_to_disk(gw, team_id, data)
+        except OSError as e:
+            print(f"Failed to persist picks for team {team_id} in GW {gw}: {str(e)}")
+    else:
+        _remember(key, data, now + LIVE_TTL)
+
+    return data
+
+
+def get_picks_cache_stats():
+    """
+    Returns hit, disk hit and miss counts since start-up and the number of entries held in memory.
+    """
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
+
+
+def log_picks_cache_stats():
+    """
+    Prints the picks cache counts since start-up and its hit rate.
+    """
+    stats = get_picks_cache_stats()
+    lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+    hit_rate = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    print(f"Picks cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, {stats['misses']} misses "
+          f"({hit_rate:.0%} hit rate), {stats['entries']} entries in memory")
+
+
+def clear_picks_cache():
+    """
+    Empties the in-memory cache and resets its counts. Picks persisted on disk are kept.
+    """
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
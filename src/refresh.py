@@ -0,0 +1,166 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.column_store import load_csv_columns
+from src.data_versions import get_fpl_data_dir, get_version_dir, publish_version, remove_stale_versions
+from src.get_data import download_files_from_github, fetch_api_data
+
+REFRESH_SEASONS = ("2023-24", "2024-25")
+REFRESH_INTERVAL = 6 * 60 * 60
+
+MERGED_GW_COLUMNS = {"element", "GW", "minutes", "position", "total_points", "value"}
+FIXTURE_COLUMNS = {"event", "team_h", "team_a"}
+
+
+def _validate_csv(local_path, required_columns, **read_csv_kwargs):
+    """
+    Loads a downloaded CSV file through its column store, rebuilding the store only if the file changed, and checks
+    that it has rows and the columns the loaders rely on.
+    """
+    df = load_csv_columns(local_path, **read_csv_kwargs)
+    missing = required_columns - set(df.columns)
+    if df.empty or missing:
+        raise ValueError(f"{local_path} is empty or missing columns {sorted(missing)}")
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _seed_staging(staging_dir):
+    """
+    Fills the staging folder with hard links to the current version's files, so downloads can be conditional and
+    unchanged files keep their column stores. Every writer replaces files rather than rewriting them, so the
+    current version is never modified through the links.
+    """
+    current_dir = get_version_dir()
+    if os.path.isdir(current_dir):
+        shutil.copytree(current_dir, staging_dir, copy_function=_link_or_copy,
+                        ignore=shutil.ignore_patterns("*.tmp"))
+    else:
+        os.makedirs(staging_dir)
+
+
+def build_version(version=None, seasons=REFRESH_SEASONS, include_all_seasons=True, max_workers=8):
+    """
+    Downloads and validates a complete data version in a hidden staging folder, then moves it into fpl-data in one
+    rename. Readers never see a half-written version.
+
+    :param version: Name of the new version, a timestamp by default
+    :param seasons: Seasons whose merged_gw.csv and fixtures.csv are fetched
+    :param include_all_seasons: Whether to fetch cleaned_merged_seasons.csv as well
+    :param max_workers: Number of downloads run in parallel
+    :return: Name of the new version
+    """
+    version = version or datetime.now().strftime("%Y-%m-%dT%H%M%S")
+    fpl_data_dir = get_fpl_data_dir()
+    staging_dir = os.path.join(fpl_data_dir, f".staging-{version}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    _seed_staging(staging_dir)
+
+    csv_files = []
+    for season in seasons:
+        csv_files.append((f"data/{season}/gws/merged_gw.csv", MERGED_GW_COLUMNS, {}))
+        csv_files.append((f"data/{season}/fixtures.csv", FIXTURE_COLUMNS, {}))
+    if include_all_seasons:
+        csv_files.append(("data/cleaned_merged_seasons.csv", MERGED_GW_COLUMNS | {"season_x"},
+                          {"dtype": {"column_name": str}, "low_memory": False}))
+
+    try:
+        # Bootstrap-static and the CSV files are independent, so they are fetched side by side
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            bootstrap = executor.submit(fetch_api_data, os.path.join(staging_dir, "bootstrap-static.json"))
+            downloaded = download_files_from_github(
+                [(remote_path, os.path.join(staging_dir, remote_path)) for remote_path, _, _ in csv_files],
+                max_workers=max_workers
+            )
+            data = bootstrap.result()
+
+        if not data or not data.get("elements") or not data.get("events"):
+            raise ValueError("bootstrap-static response has no elements or events")
+
+        for remote_path, required_columns, read_csv_kwargs in csv_files:
+            if not downloaded[remote_path]:
+                raise RuntimeError(f"Failed to download {remote_path}")
+            _validate_csv(os.path.join(staging_dir, remote_path), required_columns, **read_csv_kwargs)
+
+        os.replace(staging_dir, os.path.join(fpl_data_dir, version))
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    return version
+
+
+def refresh_data(**build_kwargs):
+    """
+    Builds a new data version and publishes it. On failure the current version keeps being served.
+
+    :param build_kwargs: Arguments passed to build_version
+    :return: Name of the published version, or None if the refresh failed
+    """
+    start = time.perf_counter()
+    try:
+        version = build_version(**build_kwargs)
+    except Exception as e:
+        print(f"Data refresh failed, keeping the current version: {str(e)}")
+        return None
+
+    publish_version(version)
+    remove_stale_versions()
+    print(f"Data refresh finished in {time.perf_counter() - start:.1f} s")
+    return version
+
+
+def current_version_age():
+    """
+    Returns how many seconds ago the current version's bootstrap data was written, or None if it has none.
+    """
+    bootstrap_path = os.path.join(get_version_dir(), "bootstrap-static.json")
+    if not os.path.exists(bootstrap_path):
+        return None
+    return time.time() - os.path.getmtime(bootstrap_path)
+
+
+class DataRefresher(threading.Thread):
+    """
+    Daemon thread that refreshes the data on a schedule, so requests only ever read files that are already on disk.
+
+    On start it refreshes straight away if the current version is missing or older than the interval, then calls
+    on_refresh (typically the cache warm-up). After that it refreshes every interval seconds and calls on_refresh
+    after each successful refresh.
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL, on_refresh=None, **build_kwargs):
+        super().__init__(name="data-refresher", daemon=True)
+        self.interval = interval
+        self.on_refresh = on_refresh
+        self.build_kwargs = build_kwargs
+        self._stop_event = threading.Event()
+
+    def _notify(self):
+        if self.on_refresh is None:
+            return
+        try:
+            self.on_refresh()
+        except Exception as e:
+            print(f"Refresh callback failed: {str(e)}")
+
+    def run(self):
+        age = current_version_age()
+        if age is None or age >= self.interval:
+            refresh_data(**self.build_kwargs)
+        self._notify()
+
+        while not self._stop_event.wait(self.interval):
+            if refresh_data(**self.build_kwargs) is not None:
+                self._notify()
+
+    def stop(self):
+        self._stop_event.set()
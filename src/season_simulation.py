@@ -1,34 +1,110 @@
+import time
 import pandas as pd
 from src.build_squad import get_eligible_players_for_gw, pick_best_squad
-from src.load_data import load_and_filter_data, load_latest_data
+from src.load_data import load_and_filter_data, load_fixture_data, filter_eligible_players
+from src.fixture_difficulty import previous_season_scale_factors
+from src.x_pts import previous_season_coefficients, walk_forward_coefficients
+from src.feature_store import RollingFeatureStore
 
-def simulate_season_2023_24(team_id=None, initial_budget=1000):
+class SeasonContext:
+    """
+    Everything a season replay needs that does not change from one game week to the next, loaded once.
+
+    :param year: Premier League Season to replay
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :param window: Number of game weeks the ICT form average covers
+    :param season_data: Unfiltered game week rows for the season, loaded from merged_gw.csv if omitted
+    :param fixtures: The season's fixtures as returned by load_fixture_data, loaded if omitted
+    :param difficulty_factors: Scale factors by position and difficulty, the previous season's if omitted
+    :param prior_coefficients: Coefficients for positions with no earlier data this season, the previous season's fit
+        if omitted; nothing fitted on the replayed season itself may be passed here
+    """
+    def __init__(self, year="2023-24", min_gw=10, min_minutes=60, window=3, season_data=None, fixtures=None, difficulty_factors=None,
+                 prior_coefficients=None):
+        self.year = year
+        self.window = window
+        if season_data is None:
+            self.season_data = load_and_filter_data(year=year, min_gw=min_gw, min_minutes=min_minutes)
+        else:
+            self.season_data = filter_eligible_players(season_data, min_gw=min_gw, min_minutes=min_minutes)
+        self.fixtures = load_fixture_data(year=year) if fixtures is None else fixtures
+        self.difficulty_factors = previous_season_scale_factors(year) if difficulty_factors is None else difficulty_factors
+        self.gameweeks = sorted(self.season_data["GW"].unique())
+
+        # Coefficients for each game week are fitted only on earlier game weeks of this season, starting from the
+        # previous season's fit
+        if prior_coefficients is None:
+            prior_coefficients = previous_season_coefficients(year)
+        self.coefficients = walk_forward_coefficients(self.season_data, self.gameweeks, fallback=prior_coefficients, window=window)
+
+        # Per-player form state, advanced one game week at a time as the replay moves forward
+        self.feature_store = RollingFeatureStore(window)
+
+        # Actual points per (GW, element), summing both fixtures in double game weeks
+        self.points = self.season_data.groupby(["GW", "element"])["total_points"].sum()
+
+    def eligible_players(self, gw):
+        return get_eligible_players_for_gw(
+            gw=gw,
+            merged_gw_df=self.season_data,
+            fixtures=self.fixtures,
+            position_coefficients=self.coefficients[gw],
+            difficulty_factors=self.difficulty_factors,
+            window=self.window,
+            feature_store=self.feature_store
+        )
+
+    def gameweek_points(self, gw, elements):
+        """
+        Looks up the actual points of several players in one game week, with 0 for players who did not play.
+        """
+        index = pd.MultiIndex.from_arrays([[gw] * len(elements), list(elements)])
+        return self.points.reindex(index, fill_value=0).to_numpy()
+
+def simulate_season_2023_24(team_id=None, initial_budget=1000, context=None):
     """
     Simulates the 2023-24 FPL season using historical data.
     
     Args:
         team_id (int, optional): Team ID to track for comparison
         initial_budget (int): Starting budget (default 1000)
+        context (SeasonContext, optional): Preloaded season context, built for 2023-24 if omitted
     
     Returns:
         tuple: Total points and gameweek breakdown
     """
-    # Load the season data
-    season_data = load_and_filter_data(year="2023-24")
-    latest_data = load_latest_data()
-    
+    # Load the season data, fixtures, difficulty factors and walk-forward coefficients once
+    return simulate_season(context or SeasonContext(year="2023-24"), initial_budget=initial_budget)
+
+def simulate_season(context, initial_budget=1000, transfer_threshold=4, criteria="xPts"):
+    """
+    Replays a season game week by game week, picking squads and transfers from the information available before each one.
+
+    Args:
+        context (SeasonContext): Preloaded season context
+        initial_budget (int): Starting budget (default 1000)
+        transfer_threshold (int): Penalty points for each transfer over the free transfers
+        criteria (str): Column used to pick squads, the best 11 and the captain from GW2 on
+
+    Returns:
+        tuple: Total points and gameweek breakdown
+    """
+    season_data = context.season_data
+
     season_points = 0
     gameweek_points = []
     current_team = None
     current_budget = initial_budget
     free_transfers = 1
 
-    for gw in range(1, 39):
+    for gw in context.gameweeks:
         print(f"\nProcessing Gameweek {gw}...")
+        gw_start = time.perf_counter()
 
         try:
-            if gw == 1:
-                # For GW1, use ict_index to pick initial squad
+            if current_team is None:
+                # For the first game week, use ict_index to pick initial squad
                 eligible_players = season_data[season_data["GW"] == gw].copy()
                 squad, best_11, captain, transfers = pick_best_squad(
                     player_data=eligible_players,
@@ -37,43 +113,30 @@ def simulate_season_2023_24(team_id=None, initial_budget=1000):
                 )
             else:
                 # Get eligible players and make transfers
-                eligible_players = get_eligible_players_for_gw(
-                    gw=gw,
-                    merged_gw_df=season_data,
-                    latest_data=latest_data
-                )
-                
+                eligible_players = context.eligible_players(gw)
+
                 squad, best_11, captain, transfers = pick_best_squad(
                     player_data=eligible_players,
                     budget=current_budget,
+                    criteria=criteria,
                     prev_squad=current_team,
-                    free_transfers=free_transfers
+                    free_transfers=free_transfers,
+                    transfer_threshold=transfer_threshold
                 )
 
+            # Calculate the transfer cost before free transfers roll over
+            transfer_cost = max(0, (len(transfers) - free_transfers) * 4)
+
             # Update free transfers for next week
             free_transfers = 2 if len(transfers) == 0 else 1
 
-            # Calculate actual points for the gameweek
-            gw_points = 0
-            transfer_cost = max(0, (len(transfers) - free_transfers) * 4)
-            
-            # Calculate points for the best 11 including captain
-            for _, player in best_11.iterrows():
-                player_gw_data = season_data[
-                    (season_data['GW'] == gw) & 
-                    (season_data['element'] == player['element'])
-                ]
-                
-                if not player_gw_data.empty:
-                    points = player_gw_data['total_points'].iloc[0]
-                    # Double points for captain
-                    if player['element'] == captain['element']:
-                        points *= 2
-                    gw_points += points
+            # Calculate points for the best 11, doubling the captain's
+            points = context.gameweek_points(gw, best_11["element"])
+            gw_points = int(points.sum() + points[(best_11["element"] == captain["element"]).to_numpy()].sum())
 
             # Subtract transfer costs
             gw_points -= transfer_cost
-            
+
             # Update season totals
             season_points += gw_points
             gameweek_points.append({
@@ -83,10 +146,10 @@ def simulate_season_2023_24(team_id=None, initial_budget=1000):
                 'Transfer_Cost': transfer_cost,
                 'Captain': captain['web_name'] if 'web_name' in captain else captain['name']
             })
-            
+
             # Update current team for next iteration
             current_team = squad
-            
+
             print(f"GW{gw} Points: {gw_points} (Transfers: {len(transfers)}, Cost: -{transfer_cost})")
             print(f"Captain: {captain['web_name'] if 'web_name' in captain else captain['name']}")
             print(f"Season Total: {season_points}")
@@ -95,10 +158,13 @@ def simulate_season_2023_24(team_id=None, initial_budget=1000):
             print(f"Error in GW{gw}: {str(e)}")
             continue
 
+        finally:
+            print(f"GW{gw} time: {(time.perf_counter() - gw_start) * 1000:.0f} ms")
+
     print(f"\nFinal Season Points: {season_points}")
     return season_points, pd.DataFrame(gameweek_points)
 
 if __name__ == "__main__":
     total_points, gw_breakdown = simulate_season_2023_24()
     print("\nGameweek Breakdown:")
-    print(gw_breakdown)
\ No newline at end of file
+    print(gw_breakdown)
@@ -0,0 +1,45 @@
+import threading
+
+_calls = {}
+_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def single_flight(key, function, *args, **kwargs):
+    """
+    Runs function at most once at a time per key. Threads that ask for the same key while a call is in flight wait
+    for it and get its result, or its exception, instead of running the function again.
+
+    :param key: Identifies the resource, e.g. the local path being downloaded
+    :param function: Function to call
+    :return: The function's return value
+    """
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = function(*args, **kwargs)
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+        call.done.set()
+
+    return call.result
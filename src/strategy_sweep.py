@@ -0,0 +1,141 @@
+import argparse
+import contextlib
+import io
+import itertools
+import multiprocessing
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.load_data import load_all_seasons_data, load_fixture_data
+from src.fixture_difficulty import previous_season_scale_factors
+from src.x_pts import previous_season_coefficients
+from src.season_simulation import SeasonContext, simulate_season
+
+DEFAULT_GRID = {
+    "transfer_threshold": [2, 4, 6],
+    "window": [3, 5],
+    "min_gw": [5, 10],
+    "min_minutes": [60],
+    "criteria": ["xPts"]
+}
+
+# Season inputs shared by every simulation in a worker process, set once by _init_worker
+_season_inputs = {}
+
+
+def _init_worker(season_inputs):
+    global _season_inputs
+    _season_inputs = season_inputs
+
+
+def _run_simulation(season, params):
+    """
+    Replays one season with one parameter combination and returns a row of the results table.
+    """
+    season_data, fixtures, difficulty_factors, prior_coefficients = _season_inputs[season]
+    start = time.perf_counter()
+
+    # Simulations print every game week, which is noise when hundreds run in parallel
+    with contextlib.redirect_stdout(io.StringIO()):
+        context = SeasonContext(
+            year=season,
+            min_gw=params["min_gw"],
+            min_minutes=params["min_minutes"],
+            window=params["window"],
+            season_data=season_data,
+            fixtures=fixtures,
+            difficulty_factors=difficulty_factors,
+            prior_coefficients=prior_coefficients
+        )
+        total_points, breakdown = simulate_season(
+            context,
+            transfer_threshold=params["transfer_threshold"],
+            criteria=params["criteria"]
+        )
+
+    return {
+        "season": season,
+        **params,
+        "total_points": total_points,
+        "gameweeks": len(breakdown),
+        "transfers": int(breakdown["Transfers"].sum()) if not breakdown.empty else 0,
+        "transfer_cost": int(breakdown["Transfer_Cost"].sum()) if not breakdown.empty else 0,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+def load_season_inputs(seasons=None):
+    """
+    Splits cleaned_merged_seasons.csv into per-season frames and loads each season's fixtures, plus the difficulty
+    factors and xPts coefficients of the season before it, so no replay is scored with models fitted on its own points.
+
+    :param seasons: Seasons to load, every season in the file by default
+    :return: Dictionary mapping season to (season_data, fixtures, difficulty_factors, prior_coefficients)
+    """
+    all_seasons = load_all_seasons_data().rename(columns={"team_x": "team"})
+    seasons = seasons or sorted(all_seasons["season_x"].unique())
+
+    season_inputs = {}
+    for season, season_data in all_seasons[all_seasons["season_x"].isin(seasons)].groupby("season_x", observed=True):
+        season_inputs[season] = (
+            season_data.reset_index(drop=True),
+            load_fixture_data(year=season),
+            previous_season_scale_factors(season),
+            previous_season_coefficients(season)
+        )
+    return season_inputs
+
+
+def run_sweep(param_grid=None, seasons=None, max_workers=None, season_inputs=None):
+    """
+    Runs a season simulation for every combination of parameters and season across a process pool.
+
+    Season data is loaded once in the parent. Workers forked from it share the frames copy-on-write; on platforms
+    without fork they receive one pickled copy each at start-up rather than one per simulation.
+
+    :param param_grid: Dictionary of parameter name to list of values, DEFAULT_GRID by default
+    :param seasons: Seasons from cleaned_merged_seasons.csv to replay, every season by default
+    :param max_workers: Number of worker processes, one per CPU by default
+    :param season_inputs: Preloaded output of load_season_inputs
+    :return: DataFrame with one row per (season, parameter combination)
+    """
+    param_grid = param_grid or DEFAULT_GRID
+    season_inputs = season_inputs or load_season_inputs(seasons)
+
+    names = list(param_grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    tasks = [(season, params) for season in season_inputs for params in combinations]
+    print(f"Running {len(tasks)} simulations ({len(season_inputs)} seasons x {len(combinations)} parameter sets)")
+
+    start_methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(season_inputs,)) as executor:
+        futures = {executor.submit(_run_simulation, season, params): (season, params) for season, params in tasks}
+        for future in as_completed(futures):
+            season, params = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Simulation failed for {season} {params}: {str(e)}")
+
+    print(f"Sweep finished in {time.perf_counter() - start:.1f} s")
+
+    columns = ["season", *names, "total_points", "gameweeks", "transfers", "transfer_cost", "seconds"]
+    return pd.DataFrame(results, columns=columns).sort_values(["season", *names]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over historical seasons.")
+    parser.add_argument("--seasons", nargs="*", help="Seasons to replay, e.g. 2022-23 2023-24")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    results = run_sweep(seasons=args.seasons, max_workers=args.workers)
+    results.to_csv(args.output, index=False)
+    print(results.groupby([name for name in DEFAULT_GRID])["total_points"].mean().sort_values(ascending=False).head(10))
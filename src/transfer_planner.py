@@ -0,0 +1,310 @@
+import time
+import numpy as np
+import pandas as pd
+import pulp
+from src.x_pts import calculate_expected_points, predict_future_xPts
+from src.load_data import load_fixture_data
+from src.fixture_difficulty import scale_pts_by_difficulty
+
+POSITION_LIMITS = {'GK': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+
+# Points charged per incoming player in the transfer MILPs, so a swap must gain more than this to be made. It is far
+# below any real xPts difference, but stops the solver spending a free transfer on a swap that gains nothing.
+TRANSFER_EPSILON = 1e-3
+
+
+def build_xpts_matrix(players, start_gw, horizon, fixtures=None, position_coefficients=None, difficulty_factors=None):
+    """
+    Builds a players x game weeks matrix of expected points from each player's ICT form and the fixture list.
+    Blank game weeks score 0 and double game weeks add up both fixtures.
+
+    Args:
+        players (pd.DataFrame): One row per player with 'position', 'player_team' and 'avg_3w_ict' columns.
+        start_gw (int): First game week of the horizon.
+        horizon (int): Number of game weeks to cover.
+        fixtures (pd.DataFrame, optional): Fixture list as returned by load_fixture_data, loaded for 2024-25 by default.
+        position_coefficients (dict, optional): Per-position regression coefficients, loaded from the model store by default.
+        difficulty_factors (pd.DataFrame, optional): Scale factors by position and difficulty, loaded from the model store by default.
+
+    Returns:
+        np.ndarray: Float matrix of shape (len(players), horizon), rows aligned with players.
+    """
+    fixtures = load_fixture_data(year="2024-25") if fixtures is None else fixtures
+    position_coefficients = calculate_expected_points() if position_coefficients is None else position_coefficients
+    difficulty_factors = scale_pts_by_difficulty() if difficulty_factors is None else difficulty_factors
+
+    gws = list(range(start_gw, start_gw + horizon))
+    window = fixtures[fixtures['GW'].isin(gws)]
+
+    # One row per (club, game week, fixture) with the difficulty the club faces
+    club_fixtures = pd.concat([
+        window[['GW', 'team_h', 'team_h_difficulty']].set_axis(['GW', 'player_team', 'difficulty'], axis=1),
+        window[['GW', 'team_a', 'team_a_difficulty']].set_axis(['GW', 'player_team', 'difficulty'], axis=1)
+    ], ignore_index=True)
+
+    rows = pd.DataFrame({
+        'row': np.arange(len(players)),
+        'position': players['position'].to_numpy(),
+        'player_team': players['player_team'].to_numpy(),
+        'avg_3w_ict': players['avg_3w_ict'].to_numpy(dtype=float)
+    })
+    rows = rows.merge(club_fixtures, on='player_team').merge(difficulty_factors, on=['position', 'difficulty'], how='left')
+
+    xPts = predict_future_xPts(
+        rows['avg_3w_ict'].to_numpy(),
+        rows['position'].to_numpy(),
+        position_coefficients,
+        rows['scale_factor'].to_numpy()
+    )
+
+    matrix = np.zeros((len(players), horizon))
+    valid = ~np.isnan(xPts)
+    np.add.at(matrix, (rows['row'].to_numpy()[valid], rows['GW'].to_numpy()[valid] - start_gw), xPts[valid])
+    return matrix
+
+
+def dominated_players(xpts, costs, positions):
+    """
+    Flags players that can be left out of the pool: another player of the same position costs no more and scores at
+    least as much in every game week, and there are as many such players as the position has squad places, so one
+    of them is always free to take the dominated player's place. The per-club limit is ignored. Of identical
+    players, the first is kept.
+
+    Args:
+        xpts (np.ndarray): Matrix of shape (players, game weeks) from build_xpts_matrix.
+        costs (np.ndarray): Cost of each player.
+        positions (np.ndarray): Position of each player.
+
+    Returns:
+        np.ndarray: Boolean mask, True for dominated players.
+    """
+    dominated = np.zeros(len(costs), dtype=bool)
+    for position, members in pd.Series(positions).groupby(positions, sort=False).indices.items():
+        points, cost = xpts[members], costs[members]
+        # at_least[d, q]: d scores at least as much as q every week for no more money
+        at_least = (points[:, None, :] >= points[None, :, :]).all(axis=2) & (cost[:, None] <= cost[None, :])
+        ranks = np.arange(len(members))
+        dominates = at_least & (~at_least.T | (ranks[:, None] < ranks[None, :]))
+        dominated[members] = dominates.sum(axis=0) >= POSITION_LIMITS.get(position, 0)
+    return dominated
+
+
+def count_hits(bought, free_transfers, max_free_transfers, wildcard_start=False):
+    """
+    Counts the hits each game week's transfers cost, banking one unused free transfer per week up to the maximum.
+
+    Args:
+        bought (np.ndarray): Boolean matrix of shape (players, game weeks), True where a player is bought.
+        free_transfers (int): Free transfers available for the first game week.
+        max_free_transfers (int): Maximum number of free transfers that can be banked.
+        wildcard_start (bool): Whether the first game week is a free wildcard, after which one free transfer is banked.
+
+    Returns:
+        np.ndarray: Number of hits per game week.
+    """
+    transfers = bought.sum(axis=0)
+    hits = np.zeros(len(transfers), dtype=int)
+    available = free_transfers
+    for t, count in enumerate(transfers):
+        if t == 0 and wildcard_start:
+            available = 1
+            continue
+        hits[t] = max(count - available, 0)
+        available = min(max(available - count, 0) + 1, max_free_transfers)
+    return hits
+
+
+def plan_transfers(player_data, start_gw, horizon, current_team=None, free_transfers=1, budget=1000,
+                   transfer_penalty=4, max_free_transfers=5, pool_size=20, cost_column=None, fixtures=None,
+                   time_limit=10, gap=0.5):
+    """
+    Plans squads and transfers over several game weeks as a single MILP, modelling banked free transfers and hits.
+
+    Args:
+        player_data (pd.DataFrame): Eligible players for the first game week of the horizon.
+        start_gw (int): First game week of the horizon.
+        horizon (int): Number of game weeks to plan.
+        current_team (pd.DataFrame, optional): Current squad; when omitted the first game week is a free wildcard.
+        free_transfers (int): Free transfers available for the first game week.
+        budget (int): Maximum squad cost.
+        transfer_penalty (int): Points deducted per transfer beyond the free ones.
+        max_free_transfers (int): Maximum number of free transfers that can be banked.
+        pool_size (int): Candidates kept per position, ranked by horizon xPts and by xPts per cost.
+        cost_column (str, optional): Cost column, "now_cost" when present and "value" otherwise.
+        fixtures (pd.DataFrame, optional): Fixture list as returned by load_fixture_data.
+        time_limit (int): Solver time limit in seconds, the best plan found so far is returned when it is reached.
+        gap (float): Absolute optimality gap in points at which the solver stops. It bounds how far a transfer or hit
+            may be from paying off, so it is kept well below transfer_penalty.
+
+    Returns:
+        list: One dict per game week with the 'GW', 'squad' DataFrame, 'transfers' pairs, 'hits', squad 'xPts' and
+            'optimal', False when the time limit stopped the solver before the plan was proven within the gap.
+    """
+    cost_column = cost_column or ("now_cost" if "now_cost" in player_data.columns else "value")
+    candidates = player_data.drop_duplicates(subset=['element'])
+    candidates = candidates[candidates['position'].notna() & candidates[cost_column].notna()]
+
+    if current_team is not None:
+        current_team = current_team.drop_duplicates(subset=['element']).copy()
+        current_cost_column = "now_cost" if "now_cost" in current_team.columns else "value"
+        current_team[cost_column] = current_team[current_cost_column]
+        if 'player_team' in current_team.columns:
+            current_team['player_team'] = current_team['player_team'].fillna(current_team['team'])
+        else:
+            current_team['player_team'] = current_team['team']
+        if 'avg_3w_ict' not in current_team.columns:
+            current_team['avg_3w_ict'] = np.nan
+        candidates = candidates[~candidates['element'].isin(current_team['element'])]
+        budget = max(budget, current_team[cost_column].sum())
+
+    candidate_xpts = build_xpts_matrix(candidates, start_gw, horizon, fixtures=fixtures)
+
+    # Keep the strongest candidates per position plus the best value picks, which may be needed to free up budget
+    totals = candidate_xpts.sum(axis=1)
+    per_cost = totals / candidates[cost_column].to_numpy(dtype=float)
+    keep = np.zeros(len(candidates), dtype=bool)
+    for members in candidates.groupby('position', sort=False, observed=True).indices.values():
+        keep[members[np.argsort(-totals[members])[:pool_size]]] = True
+        keep[members[np.argsort(-per_cost[members])[:pool_size // 2]]] = True
+    candidates = candidates[keep]
+    candidate_xpts = candidate_xpts[keep]
+
+    # Players another candidate beats on cost and every week's xPts only add interchangeable solutions to search
+    keep = ~dominated_players(candidate_xpts, candidates[cost_column].to_numpy(dtype=float), candidates['position'].to_numpy())
+    candidates = candidates[keep]
+    candidate_xpts = candidate_xpts[keep]
+
+    if current_team is not None:
+        pool = pd.concat([current_team, candidates], ignore_index=True)
+        xpts = np.vstack([build_xpts_matrix(current_team, start_gw, horizon, fixtures=fixtures), candidate_xpts])
+        owned = np.r_[np.ones(len(current_team), dtype=bool), np.zeros(len(candidates), dtype=bool)]
+    else:
+        pool = candidates.reset_index(drop=True)
+        xpts = candidate_xpts
+        owned = np.zeros(len(pool), dtype=bool)
+
+    n_players = len(pool)
+    costs = pool[cost_column].to_numpy(dtype=float)
+    position_groups = pool.groupby('position', sort=False, observed=True).indices
+    club_groups = pool.groupby('player_team', sort=False).indices
+
+    build_start = time.perf_counter()
+    # Minimise the negated points: CBC scores a MIP start for a maximisation problem with the wrong sign, so the warm
+    # start below would count as a poor plan
+    prob = pulp.LpProblem("Horizon_Transfer_Plan", pulp.LpMinimize)
+
+    # Sells follow from the squads of consecutive weeks, so only squads and buys are variables. A buy is forced to
+    # 1 when a player joins the squad, and every buy costs TRANSFER_EPSILON so none is made without a reason.
+    squad = [[pulp.LpVariable(f"squad_{p}_{t}", cat='Binary') for t in range(horizon)] for p in range(n_players)]
+    buy = [[pulp.LpVariable(f"buy_{p}_{t}", cat='Binary') for t in range(horizon)] for p in range(n_players)]
+    banked = [pulp.LpVariable(f"free_transfers_{t}", lowBound=0, upBound=max_free_transfers, cat='Integer') for t in range(horizon)]
+    hits = [pulp.LpVariable(f"hits_{t}", lowBound=0, cat='Integer') for t in range(horizon)]
+
+    # Objective function: Maximize squad xPts across the horizon minus hit costs
+    prob += -pulp.lpSum(
+        pulp.LpAffineExpression((squad[p][t], xpts[p, t]) for p in range(n_players)) - transfer_penalty * hits[t]
+        - TRANSFER_EPSILON * pulp.lpSum(buy[p][t] for p in range(n_players))
+        for t in range(horizon)
+    )
+
+    for t in range(horizon):
+        column = [squad[p][t] for p in range(n_players)]
+
+        # A player in this week's squad who was not in last week's is a buy
+        for p in range(n_players):
+            previous = squad[p][t - 1] if t > 0 else int(owned[p])
+            if t > 0 or not owned[p]:
+                prob += buy[p][t] >= column[p] - previous
+            else:
+                buy[p][t].upBound = 0
+
+        prob += pulp.LpAffineExpression(zip(column, costs)) <= budget
+        for position, limit in POSITION_LIMITS.items():
+            prob += pulp.LpAffineExpression((column[k], 1) for k in position_groups.get(position, [])) == limit
+        for members in club_groups.values():
+            prob += pulp.LpAffineExpression((column[k], 1) for k in members) <= 3
+
+        # Free transfers: a wildcard first week is unrestricted, later weeks bank one unused transfer at a time
+        transfers = pulp.lpSum(buy[p][t] for p in range(n_players))
+        if t == 0 and current_team is None:
+            prob += banked[t] == 1
+            prob += hits[t] == 0
+            continue
+        available = free_transfers if t == 0 else banked[t - 1]
+        prob += hits[t] >= transfers - available
+        prob += banked[t] <= available - transfers + hits[t] + 1
+        prob += banked[t] >= 1
+
+    # Holding the current squad is always feasible, so CBC starts from it instead of searching for a first plan
+    if current_team is not None:
+        bank = free_transfers
+        for t in range(horizon):
+            bank = min(bank + 1, max_free_transfers)
+            for p in range(n_players):
+                squad[p][t].setInitialValue(int(owned[p]))
+                buy[p][t].setInitialValue(0)
+            banked[t].setInitialValue(bank)
+            hits[t].setInitialValue(0)
+
+    build_time = time.perf_counter() - build_start
+
+    solve_start = time.perf_counter()
+    prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapAbs=gap, warmStart=current_team is not None))
+    solve_time = time.perf_counter() - solve_start
+
+    print("Status:", pulp.LpStatus[prob.status])
+    print(f"Horizon ILP ({n_players} players x {horizon} GWs) build time: {build_time * 1000:.1f} ms, solve time: {solve_time * 1000:.1f} ms")
+
+    # CBC reports a plan cut off by the time limit as optimal, only the solution status tells it apart
+    optimal = prob.sol_status == pulp.LpSolutionOptimal
+    timed_out = prob.status == pulp.LpStatusNotSolved and current_team is not None
+    if timed_out:
+        print(f"Time limit of {time_limit} s reached before any transfer plan was found, keeping the current squad")
+    elif prob.status != pulp.LpStatusOptimal or prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        raise ValueError("Failed to find a feasible transfer plan. Please check the input data.")
+    elif not optimal:
+        print(f"Time limit of {time_limit} s reached, the transfer plan is the best found and may not be optimal")
+
+    in_squad = np.array([[(var.varValue or 0) > 0.5 for var in row] for row in squad], dtype=bool)
+    previous = np.column_stack([owned, in_squad[:, :-1]])
+    bought, sold = in_squad & ~previous, previous & ~in_squad
+
+    # Score the plan on its actual transfers rather than the solver's objective, and only make transfers that beat
+    # keeping the current squad once their hits are paid
+    plan_hits = count_hits(bought, free_transfers, max_free_transfers, wildcard_start=current_team is None)
+    plan_points = (xpts * in_squad).sum() - transfer_penalty * plan_hits.sum()
+    if current_team is not None:
+        hold_points = xpts[owned].sum()
+        if timed_out or (bought.any() and plan_points <= hold_points):
+            if not timed_out:
+                print(f"Transfers gain {plan_points - hold_points:.2f} points after hits, keeping the current squad")
+            in_squad = np.repeat(owned[:, None], horizon, axis=1)
+            bought, sold = np.zeros_like(bought), np.zeros_like(sold)
+            plan_hits = np.zeros(horizon, dtype=int)
+
+    plan = []
+    for t in range(horizon):
+        gw_squad = pool[in_squad[:, t]].copy()
+        gw_squad['xPts'] = xpts[in_squad[:, t], t]
+
+        # Pair outgoing and incoming players by position so each transfer is like for like, both sides in order of
+        # their xPts over the rest of the plan so every pair is a gain whenever any like-for-like pairing can be
+        transfers = []
+        if t > 0 or current_team is not None:
+            order = np.argsort(xpts[:, t:].sum(axis=1), kind='stable')
+            players_out, players_in = pool.iloc[order[sold[order, t]]], pool.iloc[order[bought[order, t]]]
+            for position in players_out['position'].unique():
+                outs = players_out[players_out['position'] == position]
+                ins = players_in[players_in['position'] == position]
+                transfers += list(zip((row for _, row in outs.iterrows()), (row for _, row in ins.iterrows())))
+
+        plan.append({
+            'GW': start_gw + t,
+            'squad': gw_squad,
+            'transfers': transfers,
+            'hits': int(plan_hits[t]),
+            'xPts': round(float(gw_squad['xPts'].sum()), 2),
+            'optimal': optimal
+        })
+
+    return plan
@@ -1,66 +1,307 @@
-from statistics import correlation
-from pulp import re
-from sklearn.linear_model import LinearRegression
-from src.load_data import load_and_filter_data, load_and_filter_all_seasons_data
+from src.load_data import load_and_filter_data, load_and_filter_all_seasons_data, ensure_merged_gw_file, previous_season
+from src.model_store import file_digest, get_models_dir
+from src.form_features import build_form_features
+from src.feature_store import RollingFeatureStore
+from src.atomic_io import atomic_write, load_pickle
+import os
+import pickle
+import threading
+import numpy as np
 import pandas as pd
 
-def calculate_expected_points(df=load_and_filter_data(), criteria="ict_index"):
+STAT_COLUMNS = ["n", "sx", "sy", "sxx", "sxy", "syy"]
+
+_season_stats = {}
+_season_stats_lock = threading.Lock()
+
+def calculate_expected_points(df=None, criteria="ict_index", year="2023-24"):
     """
     Calculates the expected points based on the selected criteria for each position.
 
+    :param df: The input DataFrame containing the filtered game week data. When omitted, the coefficients for the
+        year's season are fitted from its stored regression statistics, see get_season_stats, and only refitted
+        when new game weeks are folded in.
+    :param criteria: The criteria (column) for which to calculate rolling averages and fit models.
+    :param year: Season fitted when df is omitted.
+    :return: A dictionary with position-based models and coefficients.
+    """
+    if df is None:
+        return get_season_stats(year, criteria).fit()
+
+    return fit_expected_points(df, criteria)
+
+def fit_expected_points(df, criteria="ict_index"):
+    """
+    Fits a linear model per position between the previous 3 game weeks' average of the criteria and the game week's points.
+
     :param df: The input DataFrame containing the filtered game week data.
     :param criteria: The criteria (column) for which to calculate rolling averages and fit models.
     :return: A dictionary with position-based models and coefficients.
     """
-    # Ensure the data is sorted by player (element) and game week (GW)
-    df = df.sort_values(by=["element", "GW"])
+    return fit_from_stats(regression_stats(df, criteria))
+
+def add_rolling_average(df, criteria="ict_index", window=3):
+    """
+    Adds the previous game weeks' rolling average of the criteria as an "avg_3w_<criteria>" column and drops rows
+    where it is NaN or 0, which includes each player's first row. The column keeps its name for other window sizes
+    so downstream code is unchanged.
 
-    # Calculate the rolling average for the criteria for the last 3 game weeks
+    :param df: The input DataFrame containing the filtered game week data.
+    :param criteria: The criteria (column) for which to calculate rolling averages.
+    :param window: Number of game weeks to average over.
+    :return: DataFrame sorted by element and GW with the rolling average column.
+    """
+    # The average comes from the shared form feature builder, in float64 so the regression sums keep full precision
+    df = df.sort_values(by=["element", "GW"], kind="stable")
+    features = build_form_features(df, [criteria], windows=(window,), halflives=(), dtype=np.float64)
     rolling_avg_column = f"avg_3w_{criteria}"
-    df[rolling_avg_column] = df.groupby("element")[criteria].rolling(window=3, min_periods=1).mean().shift(1).reset_index(level=0, drop=True)
+    df[rolling_avg_column] = features.iloc[:, 0].to_numpy()
 
     # Filter out rows where the rolling average is NaN or 0
     df = df.dropna(subset=[rolling_avg_column])
-    df = df[df[rolling_avg_column] != 0]
+    return df[df[rolling_avg_column] != 0]
 
-    # Split data by position
-    position_groups = df.groupby("position")
+def column_stats(df, column, season=None):
+    """
+    Sums the sufficient statistics of a points ~ column regression per (season, GW, position).
 
-    # Store models and coefficients for each position
-    position_coefficients = {}
+    :param df: DataFrame with "GW", "position", "total_points" and the feature column.
+    :param column: The feature column.
+    :param season: Season label for every row, taken from "season_x" when omitted and the column exists.
+    :return: DataFrame with season, GW and position columns and the STAT_COLUMNS sums.
+    """
+    x = df[column].to_numpy(dtype=np.float64)
+    y = df["total_points"].to_numpy(dtype=np.float64)
+    if season is None:
+        season = df["season_x"].astype(str).to_numpy() if "season_x" in df.columns else ""
 
-    for position, group in position_groups:
-        # For each position, correlate the last 3 weeks' average criteria with the current game week's points
-        X = group[rolling_avg_column].values.reshape(-1, 1)
-        y = group["total_points"].values
+    terms = pd.DataFrame({
+        "season": season,
+        "GW": df["GW"].to_numpy(),
+        "position": df["position"].astype(str).to_numpy(),
+        "n": 1,
+        "sx": x,
+        "sy": y,
+        "sxx": x * x,
+        "sxy": x * y,
+        "syy": y * y
+    })
+    return terms.groupby(["season", "GW", "position"], sort=True).sum().reset_index()
 
-        model = LinearRegression()
-        model.fit(X, y)
+def regression_stats(df, criteria="ict_index", window=3, season=None):
+    """
+    Computes the stored form of the xPts regression: the sufficient statistics (n, sums of x, y, x^2, xy and y^2)
+    of points against the previous game weeks' average of the criteria, per (season, GW, position). Any season or
+    game week window can then be fitted by summing rows, see fit_from_stats.
+
+    :param df: The input DataFrame containing filtered game week data.
+    :param criteria: The criteria (column) for which to calculate rolling averages.
+    :param window: Number of game weeks the rolling average covers.
+    :param season: Season label for every row, see column_stats.
+    :return: DataFrame with season, GW and position columns and the STAT_COLUMNS sums.
+    """
+    return column_stats(add_rolling_average(df, criteria, window), f"avg_3w_{criteria}", season)
+
+class SeasonRegressionStats:
+    """
+    The regression statistics of one season, kept current game week by game week. A RollingFeatureStore holds each
+    player's last window values of the criteria, so the rolling average of a new row needs only that player's
+    stored tail, and folding in a game week costs time in proportion to its rows rather than the whole season.
+    Fits are memoized until the statistics change.
+
+    :param season: Season label stored in the statistics
+    :param criteria: The criteria (column) for which to calculate rolling averages
+    :param window: Number of game weeks the rolling average covers
+    """
+    def __init__(self, season, criteria="ict_index", window=3):
+        self.season = season
+        self.criteria = criteria
+        self.store = RollingFeatureStore(window, feature=criteria)
+        self.stats = pd.DataFrame(columns=["season", "GW", "position", *STAT_COLUMNS])
+        self.source = None
+        self._fits = {}
 
-        # Store the model and coefficients for this position
-        position_coefficients[position] = {
-            "coef": model.coef_[0],
-            "intercept": model.intercept_,
-            "correlation": model.score(X, y)
-        }
+    def update(self, df):
+        """
+        Folds the rows of df the statistics do not cover yet: new game weeks, and every row of players who only now
+        pass the eligibility filter. If earlier game weeks changed the statistics are rebuilt.
 
-    return position_coefficients
+        :param df: The season's filtered game week data
+        :return: Number of rows folded in
+        """
+        stream, through_gw = self.store.new_rows(df)
+        if not self.store.through_gw:
+            self.stats = self.stats.iloc[0:0]
+        if stream.empty:
+            return 0
+
+        # The rolling average of each new row, from the store before the rows are folded into it
+        column = f"avg_3w_{self.criteria}"
+        form = self.store.preceding_means(stream)
+        valid = ~np.isnan(form) & (form != 0)
+        new_stats = column_stats(stream[valid].assign(**{column: form[valid]}), column, self.season)
+        self.store.fold(stream, through_gw, df)
+
+        merged = pd.concat([self.stats, new_stats], ignore_index=True)
+        self.stats = merged.groupby(["season", "GW", "position"], sort=True)[STAT_COLUMNS].sum().reset_index()
+        self._fits = {}
+        return len(stream)
+
+    def fit(self, min_gw=None, max_gw=None, min_samples=1):
+        """
+        Returns fit_from_stats for the season, computed once per game week window until the statistics change.
+        """
+        key = (min_gw, max_gw, min_samples)
+        if key not in self._fits:
+            self._fits[key] = fit_from_stats(self.stats, min_gw=min_gw, max_gw=max_gw, min_samples=min_samples)
+        return self._fits[key]
+
+def get_season_stats(year="2023-24", criteria="ict_index", window=3, min_gw=10, min_minutes=60):
+    """
+    Returns a season's regression statistics, folding in whatever the season file gained since they were last
+    updated. The statistics persist in the models folder, so a refresh that adds a game week only processes that
+    game week's rows, and calls while the file is unchanged cost one digest lookup.
+
+    :param year: Premier League Season
+    :param criteria: The criteria (column) for which to calculate rolling averages
+    :param window: Number of game weeks the rolling average covers
+    :param min_gw: The minimum number of game weeks a player must have played the specified minutes
+    :param min_minutes: The minimum number of minutes a player must have played in a game week
+    :return: SeasonRegressionStats
+    """
+    key = (year, criteria, window, min_gw, min_minutes)
+    file_path = os.path.join(get_models_dir(), f"xpts-stats-{year}-{criteria}-{window}-{min_gw}-{min_minutes}.pkl")
+    with _season_stats_lock:
+        state = _season_stats.get(key)
+        if state is None:
+            state = load_pickle(file_path)
+            if state is None:
+                state = SeasonRegressionStats(year, criteria, window)
+            _season_stats[key] = state
+
+    source_path = ensure_merged_gw_file(year)
+    digest = file_digest(source_path)
+    with state.store.lock:
+        if state.source != digest:
+            df = load_and_filter_data(year=year, min_gw=min_gw, min_minutes=min_minutes, columns=[criteria, "total_points"])
+            rows = state.update(df)
+            state.source = digest
+            print(f"Folded {rows} rows into the {year} xPts statistics")
+
+            with atomic_write(file_path) as file:
+                pickle.dump(state, file)
+    return state
+
+def fit_from_stats(stats, seasons=None, min_gw=None, max_gw=None, min_samples=1):
+    """
+    Fits the per-position linear models by summing stored regression statistics, so the cost depends on the
+    number of (season, GW, position) rows rather than on the number of game week rows behind them.
+
+    :param stats: Output of regression_stats.
+    :param seasons: Seasons to include, all by default.
+    :param min_gw: First game week to include.
+    :param max_gw: Last game week to include.
+    :param min_samples: Positions with fewer rows than this are left out.
+    :return: A dictionary with position-based coefficients, intercepts and R^2 ("correlation").
+    """
+    mask = np.ones(len(stats), dtype=bool)
+    if seasons is not None:
+        mask &= stats["season"].isin(seasons).to_numpy()
+    if min_gw is not None:
+        mask &= (stats["GW"] >= min_gw).to_numpy()
+    if max_gw is not None:
+        mask &= (stats["GW"] <= max_gw).to_numpy()
+
+    totals = stats[mask].groupby("position", sort=True)[STAT_COLUMNS].sum()
+    return _coefficients_from_sums(totals[totals["n"] >= max(min_samples, 1)])
+
+def _coefficients_from_sums(totals):
+    """
+    Solves simple linear regressions from summed statistics indexed by position, matching LinearRegression:
+    a constant feature gets a zero coefficient and the mean as intercept.
+    """
+    n = totals["n"].to_numpy(dtype=np.float64)
+    sx, sy = totals["sx"].to_numpy(), totals["sy"].to_numpy()
+    sxx = totals["sxx"].to_numpy() - sx * sx / n
+    sxy = totals["sxy"].to_numpy() - sx * sy / n
+    syy = totals["syy"].to_numpy() - sy * sy / n
+
+    # Centred sums that cancel to rounding noise are treated as zero variance
+    sxx = np.where(sxx > 1e-12 * np.maximum(totals["sxx"].to_numpy(), 1), sxx, 0.0)
+    syy = np.where(syy > 1e-12 * np.maximum(totals["syy"].to_numpy(), 1), syy, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coef = np.where(sxx > 0, sxy / sxx, 0.0)
+        correlation = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), np.where(syy > 0, 0.0, 1.0))
+    intercept = (sy - coef * sx) / n
+
+    return {
+        position: {"coef": coef[i], "intercept": intercept[i], "correlation": float(correlation[i])}
+        for i, position in enumerate(totals.index)
+    }
+
+def walk_forward_coefficients(df, gws, criteria="ict_index", fallback=None, window=3):
+    """
+    Fits the per-position models once per game week using only rows from earlier game weeks, so backtests never
+    see future points. The season's regression statistics are computed once and each game week's fit sums the
+    statistics of the game weeks before it.
+
+    :param df: The input DataFrame containing one season of filtered game week data.
+    :param gws: Game weeks to produce coefficients for.
+    :param criteria: The criteria (column) for which to calculate rolling averages and fit models.
+    :param fallback: Coefficients used for positions with no earlier data, typically a previous season's fit.
+    :param window: Number of game weeks the rolling average covers.
+    :return: A dictionary mapping each game week to its position coefficients.
+    """
+    stats = regression_stats(df, criteria, window, season="")
+
+    coefficients_by_gw = {}
+    for gw in gws:
+        coefficients = dict(fallback or {})
+        # A regression needs at least two rows to be defined
+        coefficients.update(fit_from_stats(stats, max_gw=gw - 1, min_samples=2))
+        coefficients_by_gw[gw] = coefficients
+
+    return coefficients_by_gw
+
+def previous_season_coefficients(year, criteria="ict_index"):
+    """
+    Returns the coefficients fitted on the season before year, the prior a backtest of year may use without
+    seeing any of that season's points, or an empty dictionary if that season's data is not available.
+
+    :param year: The season being replayed, e.g. "2023-24".
+    :param criteria: The criteria (column) for which to calculate rolling averages and fit models.
+    :return: A dictionary with position-based models and coefficients.
+    """
+    try:
+        return calculate_expected_points(criteria=criteria, year=previous_season(year))
+    except FileNotFoundError:
+        print(f"No data for {previous_season(year)}, replaying {year} without prior coefficients")
+        return {}
 
 def predict_future_xPts(average_ict, position, position_coefficients, scale_factor):
     """
     Predicts the expected points (xPts) based on the 3-week average ICT index for a specific position, adjusted by fixture difficulty.
+    Accepts either scalars for a single player or equal-length arrays for a batch of players.
 
-    :param average_ict: The 3-week average ICT index for a player
-    :param position: The position of the player (GK, DEF, MID, FWD)
+    :param average_ict: The 3-week average ICT index for a player, or an array of them
+    :param position: The position of the player (GK, DEF, MID, FWD), or an array of them
     :param position_coefficients: A dictionary containing the coefficients and intercepts for each position
-    :param scale_factor: Scale factor based on fixture difficulty
-    :return: Predicted expected points (xPts)
-    """
-    coef = position_coefficients[position]["coef"]
-    intercept = position_coefficients[position]["intercept"]
-    xPts = ((coef * average_ict) + intercept) * scale_factor
-    xPts = round(xPts, 1)
-    return xPts
+    :param scale_factor: Scale factor based on fixture difficulty, or an array of them
+    :return: Predicted expected points (xPts), as a float or a NumPy array
+    """
+    if np.ndim(position) == 0:
+        coef = position_coefficients[position]["coef"]
+        intercept = position_coefficients[position]["intercept"]
+        xPts = ((coef * average_ict) + intercept) * scale_factor
+        xPts = round(xPts, 1)
+        return xPts
+
+    positions = pd.Series(position)
+    coef = positions.map({pos: values["coef"] for pos, values in position_coefficients.items()}).to_numpy(dtype=float)
+    intercept = positions.map({pos: values["intercept"] for pos, values in position_coefficients.items()}).to_numpy(dtype=float)
+    xPts = ((coef * np.asarray(average_ict, dtype=float)) + intercept) * np.asarray(scale_factor, dtype=float)
+    return np.round(xPts, 1)
 
 if __name__ == "__main__":
     calculate_expected_points()
\ No newline at end of file
@@ -0,0 +1,28 @@
+import pandas as pd
+
+import app
+
+
+def make_squad(positions):
+    """
+    Builds a squad whose position column is categorical with categories in first-appearance order, as the CSVs load.
+    """
+    return pd.DataFrame({
+        "name": [f"Player {index}" for index in range(len(positions))],
+        "position": pd.Categorical(positions, categories=list(dict.fromkeys(positions))),
+        "value": [50] * len(positions),
+        "xPts": [1.0] * len(positions)
+    })
+
+
+def test_process_squad_data_lists_players_goalkeepers_first(monkeypatch):
+    squad = make_squad(["MID"] * 5 + ["DEF"] * 5 + ["GK"] * 2 + ["FWD"] * 3)
+    best_11 = make_squad(["MID"] * 4 + ["DEF"] * 4 + ["GK"] + ["FWD"] * 2)
+    captain = best_11.iloc[0]
+    monkeypatch.setattr(app, "get_best_possible_squad", lambda fresh=False: (squad, best_11, captain, 11.0, []))
+    monkeypatch.setattr(app, "get_gameweek", lambda: 20)
+
+    result = app.process_squad_data(None, 0, True)
+
+    assert [player["position"] for player in result["squad"]] == ["GK"] * 2 + ["DEF"] * 5 + ["MID"] * 5 + ["FWD"] * 3
+    assert [player["position"] for player in result["best_11"]] == ["GK"] + ["DEF"] * 4 + ["MID"] * 4 + ["FWD"] * 2
@@ -0,0 +1,30 @@
+import pickle
+
+import pytest
+
+from src.atomic_io import atomic_write, load_pickle
+
+
+def test_atomic_write_keeps_the_old_file_when_the_write_fails(tmp_path):
+    file_path = tmp_path / "CURRENT"
+    file_path.write_text("2024-08-01")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(file_path), "w") as file:
+            file.write("2024-08-02")
+            raise RuntimeError("interrupted")
+
+    assert file_path.read_text() == "2024-08-01"
+    assert [path.name for path in tmp_path.iterdir()] == ["CURRENT"]
+
+
+def test_load_pickle_treats_missing_and_truncated_files_as_absent(tmp_path):
+    file_path = tmp_path / "models" / "artifact.pkl"
+    assert load_pickle(str(file_path)) is None
+
+    with atomic_write(str(file_path)) as file:
+        pickle.dump({"coefficients": [1.0, 2.0]}, file)
+    assert load_pickle(str(file_path)) == {"coefficients": [1.0, 2.0]}
+
+    file_path.write_bytes(file_path.read_bytes()[:5])
+    assert load_pickle(str(file_path)) is None
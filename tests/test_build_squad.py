@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from src.build_squad import optimize_transfers, pick_best_squad
+
+
+def make_players(positions, xpts, first_element=1, costs=None):
+    return pd.DataFrame({
+        "element": range(first_element, first_element + len(positions)),
+        "name": [f"Player {first_element + index}" for index in range(len(positions))],
+        "position": positions,
+        "team": range(1, len(positions) + 1),
+        "player_team": range(1, len(positions) + 1),
+        "now_cost": costs or [50] * len(positions),
+        "xPts": xpts
+    })
+
+
+def test_optimize_transfers_skips_swaps_that_gain_nothing():
+    positions = ["GK"] * 2 + ["DEF"] * 5 + ["MID"] * 5 + ["FWD"] * 3
+    current_team = make_players(positions, [float(index) for index in range(1, 16)])
+    # Every candidate is an exact copy of the weakest squad player in its position, so no transfer can gain anything
+    weakest = current_team.sort_values(by="xPts").drop_duplicates(subset=["position"])
+    candidates = weakest.assign(element=weakest["element"] + 100)
+
+    squad, transfers = optimize_transfers(current_team, pd.concat([current_team, candidates]), 5, 1000)
+
+    assert transfers == []
+    assert sorted(squad["element"]) == sorted(current_team["element"])
+
+
+def test_optimize_transfers_pairs_each_transfer_as_a_gain():
+    positions = ["GK"] * 2 + ["DEF"] * 5 + ["MID"] * 5 + ["FWD"] * 3
+    xpts = [1.0, 1.0] + [2.0] * 5 + [1.0, 3.0, 8.0, 8.0, 8.0] + [2.0] * 3
+    costs = [50] * 7 + [50, 90, 50, 50, 50] + [50] * 3
+    current_team = make_players(positions, xpts, costs=costs)
+    # Only selling both weak midfielders affords the expensive one, which pays for the cheap one too
+    candidates = make_players(["MID", "MID"], [2.0, 6.0], first_element=100, costs=[40, 100])
+
+    _, transfers = optimize_transfers(current_team, pd.concat([current_team, candidates]), 2, 0)
+
+    assert len(transfers) == 2
+    assert all(player_in["xPts"] > player_out["xPts"] for player_out, player_in in transfers)
+
+
+def test_pick_best_squad_needs_a_game_week_for_a_horizon():
+    players = make_players(["GK"] * 2 + ["DEF"] * 5 + ["MID"] * 5 + ["FWD"] * 3, [1.0] * 15)
+
+    with pytest.raises(ValueError, match="gw"):
+        pick_best_squad(players, horizon=3)
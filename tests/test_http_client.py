@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+from src import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+def serve(monkeypatch, response):
+    sent = []
+
+    def get(url, timeout=None, headers=None, **kwargs):
+        sent.append(headers)
+        return response
+
+    monkeypatch.setattr(http_client, "get", get)
+    return sent
+
+
+def test_download_keeps_the_file_on_304_for_a_conditional_request(monkeypatch, tmp_path):
+    local_path = tmp_path / "bootstrap-static.json"
+    serve(monkeypatch, FakeResponse(200, b"{}", {"ETag": '"v1"'}))
+    assert http_client.download("http://fpl/bootstrap-static/", str(local_path)) == "downloaded"
+
+    sent = serve(monkeypatch, FakeResponse(304))
+    assert http_client.download("http://fpl/bootstrap-static/", str(local_path)) == "not_modified"
+    assert sent == [{"If-None-Match": '"v1"'}]
+    assert local_path.read_bytes() == b"{}"
+
+
+def test_download_rejects_304_for_an_unconditional_request(monkeypatch, tmp_path):
+    local_path = tmp_path / "bootstrap-static.json"
+    local_path.write_bytes(b"{}")
+    serve(monkeypatch, FakeResponse(304))
+
+    with pytest.raises(requests.HTTPError):
+        http_client.download("http://fpl/bootstrap-static/", str(local_path))
+    assert local_path.read_bytes() == b"{}"
@@ -0,0 +1,22 @@
+import json
+
+from src.load_data import BootstrapSnapshot
+
+
+def test_bootstrap_snapshot_exposes_events_and_teams_tables(tmp_path):
+    file_path = tmp_path / "bootstrap-static.json"
+    file_path.write_text(json.dumps({
+        "elements": [{"id": 1, "now_cost": 55, "chance_of_playing_next_round": None, "web_name": "Saka",
+                      "element_type": 3, "team": 1}],
+        "events": [{"id": 1, "is_next": False, "is_current": True, "finished": True},
+                   {"id": 2, "is_next": True, "is_current": False, "finished": False}],
+        "teams": [{"id": 1, "name": "Arsenal", "short_name": "ARS", "strength": 5},
+                  {"id": 2, "name": "Aston Villa", "short_name": "AVL", "strength": 4}]
+    }))
+
+    snapshot = BootstrapSnapshot(str(file_path), version=("test",))
+
+    assert snapshot.gameweek == 2
+    assert snapshot.finished_gameweeks == {1}
+    assert snapshot.events["id"].tolist() == [1, 2]
+    assert snapshot.teams.set_index("id")["short_name"].to_dict() == {1: "ARS", 2: "AVL"}
@@ -0,0 +1,21 @@
+import os
+
+from src import model_store
+
+
+def test_load_or_compute_keeps_only_the_latest_artifact_per_name(monkeypatch, tmp_path):
+    monkeypatch.setenv("FPL_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(model_store, "_artifacts", {})
+    source_path = tmp_path / "fixtures.csv"
+
+    source_path.write_text("gw,difficulty\n1,2\n")
+    model_store.load_or_compute("scale-2023-24", [str(source_path)], {}, lambda: "first")
+    model_store.load_or_compute("scale-2024-25", [str(source_path)], {}, lambda: "other season")
+    source_path.write_text("gw,difficulty\n1,2\n2,4\n")
+    assert model_store.load_or_compute("scale-2023-24", [str(source_path)], {}, lambda: "second") == "second"
+
+    artifacts = sorted(os.listdir(tmp_path / "models"))
+    assert [file_name.rsplit("-", 1)[0] for file_name in artifacts] == ["scale-2023-24", "scale-2024-25"]
+    assert {name: artifact for name, (_, artifact) in model_store._artifacts.items()} == {
+        "scale-2023-24": "second", "scale-2024-25": "other season"
+    }
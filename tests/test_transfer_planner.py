@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.transfer_planner import count_hits, dominated_players
+
+
+def test_count_hits_banks_one_unused_transfer_a_week():
+    # Transfers per week: 0, 3, 1, 0
+    bought = np.zeros((20, 4), dtype=bool)
+    bought[:3, 1] = True
+    bought[3, 2] = True
+
+    assert list(count_hits(bought, free_transfers=1, max_free_transfers=5)) == [0, 1, 0, 0]
+
+
+def test_count_hits_after_a_wildcard():
+    bought = np.zeros((20, 2), dtype=bool)
+    bought[:15, 0] = True
+    bought[15:17, 1] = True
+
+    assert list(count_hits(bought, free_transfers=0, max_free_transfers=5, wildcard_start=True)) == [0, 1]
+
+
+def test_dominated_players_needs_a_dominating_player_per_squad_place():
+    # Three forwards score at least as much as forward 2 for no more money and five as forward 3, while only forward 0
+    # beats forward 4 and nobody is as cheap as forward 5
+    xpts = np.array([[5.0, 5.0], [4.0, 6.0], [4.0, 4.0], [3.0, 3.0], [4.5, 4.5], [3.0, 3.0]])
+    costs = np.array([50.0, 50.0, 50.0, 60.0, 50.0, 40.0])
+    positions = np.array(["FWD"] * 6)
+
+    assert list(dominated_players(xpts, costs, positions)) == [False, False, True, True, False, False]